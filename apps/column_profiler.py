@@ -0,0 +1,177 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+# Rows of a file read at a time
+CHUNK_ROWS = 500_000
+
+# Smallest value hashes kept per column to estimate its distinct count; up to this many
+# distinct values the count is exact
+DISTINCT_K = 4096
+
+# Values kept per numeric column, as a uniform random sample, to estimate its quantiles
+QUANTILE_SAMPLE = 20_000
+
+# Distinct values whose frequencies are tracked per text column to find its most common value
+MODE_CAPACITY = 10_000
+
+# Quantiles reported for numeric columns
+QUANTILES = [0.25, 0.5, 0.75]
+
+# Function to identify a file by its contents, so a profile is only computed once per file
+def file_digest(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
+
+# Function to read a CSV or Excel file a chunk of rows at a time, optionally only some columns
+# and with every value read as text
+def read_chunks(file, file_name, chunk_rows=CHUNK_ROWS, usecols=None, as_text=False):
+    dtype = str if as_text else None
+    if file_name.endswith('.xlsx'):
+        # Excel cannot be read in chunks
+        yield pd.read_excel(file, usecols=usecols, dtype=dtype)
+    else:
+        yield from pd.read_csv(file, chunksize=chunk_rows, usecols=usecols, dtype=dtype)
+
+# Running summary of one column, updated chunk by chunk: the count of non-missing values, the
+# mean and sum of squared deviations (merged with Chan's update), the range, the smallest
+# value hashes for the distinct count, a random sample for the quantiles, and the frequencies
+# of the most common values. When the frequency table is trimmed, mode_error bounds how far any
+# value's tracked count can fall short of its true count.
+class ColumnProfile:
+    def __init__(self):
+        self.dtype = None
+        self.mixed = False
+        self.rows = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.sample_keys = np.zeros(0)
+        self.sample = np.zeros(0)
+        self.frequencies = pd.Series(dtype=np.float64)
+        self.mode_error = 0.0
+
+    def update(self, series, rng):
+        # A column is numeric only if every chunk is; a mix of int and float chunks is float. An
+        # all-missing chunk is read as float whatever the column holds, so it does not count.
+        if self.dtype is not None and series.isna().all():
+            pass
+        elif self.dtype is None or self.dtype == series.dtype:
+            self.dtype = series.dtype
+        elif is_numeric_dtype(self.dtype) and is_numeric_dtype(series.dtype):
+            self.dtype = np.result_type(self.dtype, series.dtype)
+        else:
+            # Numeric and text chunks in one column are only summarized correctly as text
+            self.mixed = self.mixed or is_numeric_dtype(self.dtype) != is_numeric_dtype(series.dtype)
+            self.dtype = np.dtype(object)
+
+        self.rows += len(series)
+        values = series.dropna()
+        if not len(values):
+            return
+
+        self.hashes = np.unique(np.concatenate([self.hashes, self.smallest_hashes(values)]))[:DISTINCT_K]
+        if not is_numeric_dtype(series.dtype):
+            # Only text columns report a most common value
+            self.frequencies = self.frequencies.add(values.value_counts(), fill_value=0)
+            if len(self.frequencies) > MODE_CAPACITY:
+                self.frequencies = self.frequencies.sort_values(ascending=False)
+                self.mode_error += self.frequencies.iloc[MODE_CAPACITY]
+                self.frequencies = self.frequencies.iloc[:MODE_CAPACITY]
+        else:
+            x = values.to_numpy(dtype=np.float64)
+            count, mean = len(x), x.mean()
+            total = self.count + count
+            delta = mean - self.mean
+            self.m2 += ((x - mean) ** 2).sum() + delta ** 2 * self.count * count / total
+            self.mean += delta * count / total
+            self.minimum = min(self.minimum, x.min())
+            self.maximum = max(self.maximum, x.max())
+
+            # Keeping the values with the smallest random keys keeps a uniform sample
+            self.sample_keys = np.concatenate([self.sample_keys, rng.random(count)])
+            self.sample = np.concatenate([self.sample, x])
+            if len(self.sample) > QUANTILE_SAMPLE:
+                keep = np.argpartition(self.sample_keys, QUANTILE_SAMPLE)[:QUANTILE_SAMPLE]
+                self.sample_keys, self.sample = self.sample_keys[keep], self.sample[keep]
+        self.count += len(values)
+
+    # Function to hash a chunk's values and keep only those that can be among the DISTINCT_K
+    # smallest distinct hashes, avoiding a full sort of the chunk when it can
+    def smallest_hashes(self, values):
+        if is_numeric_dtype(values.dtype):
+            # Hash numbers as floats so 5 in an int chunk and 5.0 in a float chunk are one value
+            hashes = pd.util.hash_array(values.to_numpy(dtype=np.float64))
+        else:
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        if len(self.hashes) == DISTINCT_K:
+            hashes = hashes[hashes < self.hashes[-1]]
+        if len(hashes) > 4 * DISTINCT_K:
+            cutoff = np.partition(hashes, 4 * DISTINCT_K)[4 * DISTINCT_K]
+            smallest = hashes[hashes <= cutoff]
+            # Everything below the cutoff is kept, so if it holds enough distinct hashes it holds the smallest ones
+            if len(np.unique(smallest)) >= DISTINCT_K:
+                return smallest
+        return hashes
+
+    # Estimate of the number of distinct values from the DISTINCT_K-th smallest hash, which can
+    # never exceed the number of values
+    def distinct(self):
+        if len(self.hashes) < DISTINCT_K:
+            return len(self.hashes)
+        return min(int(round((DISTINCT_K - 1) / (self.hashes[-1] / 2.0 ** 64))), self.count)
+
+    # Most common value of a text column. After a trim it is marked approximate unless its tracked
+    # count beats every other value's count even with mode_error added.
+    def most_common(self):
+        if self.dtype != object or not len(self.frequencies):
+            return np.nan
+        counts = self.frequencies.nlargest(2)
+        runner_up = counts.iloc[1] if len(counts) > 1 else 0
+        if self.mode_error == 0 or counts.iloc[0] > runner_up + self.mode_error:
+            return counts.index[0]
+        return f'{counts.index[0]} (approx.)'
+
+    def summary(self):
+        numeric = is_numeric_dtype(self.dtype)
+        row = {
+            'Dtype': str(self.dtype),
+            'Count': self.count,
+            'Missing %': 100 * (1 - self.count / self.rows) if self.rows else np.nan,
+            'Unique': self.distinct(),
+            'Most Common': self.most_common(),
+            'Mean': self.mean if numeric and self.count else np.nan,
+            'Std': np.sqrt(self.m2 / (self.count - 1)) if numeric and self.count > 1 else np.nan,
+            'Min': self.minimum if numeric and self.count else np.nan,
+            'Max': self.maximum if numeric and self.count else np.nan,
+        }
+        for q in QUANTILES:
+            row[f'{q:.0%}'] = np.quantile(self.sample, q) if numeric and self.count else np.nan
+        return row
+
+# Function to profile every column of a file in one chunked pass. Returns a DataFrame with a
+# row per column: dtype, count, missing percentage, distinct count (estimated beyond
+# DISTINCT_K), most common value of text columns, mean, standard deviation, min, max, and
+# quartiles estimated from a sample of QUANTILE_SAMPLE values. Columns that turn out to mix
+# numbers and text are profiled again as text in a second pass over just those columns.
+def profile_file(file, file_name, chunk_rows=CHUNK_ROWS):
+    rng = np.random.default_rng(0)
+    profiles = {}
+    for chunk in read_chunks(file, file_name, chunk_rows):
+        for column in chunk.columns:
+            profiles.setdefault(column, ColumnProfile()).update(chunk[column], rng)
+
+    mixed = [column for column, profile in profiles.items() if profile.mixed]
+    if mixed:
+        file.seek(0)
+        for column in mixed:
+            profiles[column] = ColumnProfile()
+        for chunk in read_chunks(file, file_name, chunk_rows, usecols=mixed, as_text=True):
+            for column in mixed:
+                profiles[column].update(chunk[column], rng)
+    summary = pd.DataFrame([profile.summary() for profile in profiles.values()], index=list(profiles))
+    return summary[['Dtype', 'Count', 'Missing %', 'Unique', 'Most Common', 'Mean', 'Std',
+                    'Min', *[f'{q:.0%}' for q in QUANTILES], 'Max']]
@@ -0,0 +1,75 @@
+import functools
+import numpy as np
+from scipy import stats
+
+# Points in a cached grid
+GRID_POINTS = 1000
+
+# Probability left out of each end of a grid
+GRID_TAIL = 0.001
+
+# Standardized grids kept before the least recently used one is evicted
+GRID_CACHE_SIZE = 128
+
+# Upper-tail probabilities of the critical-value tables, in steps of 0.0005 up to 0.25, which
+# covers every two-sided significance level up to 0.5
+TABLE_STEPS = 2000
+TABLE_TAILS = np.arange(1, TABLE_STEPS // 4 + 1) / TABLE_STEPS
+
+# Degrees of freedom of the t critical-value table
+TABLE_DF = np.arange(1, 201)
+
+# Function to evaluate the pdf and cdf of a standardized distribution (loc 0, scale 1) on an
+# evenly spaced grid between its GRID_TAIL and 1 - GRID_TAIL quantiles. The arrays are
+# read-only because they are shared by every caller.
+@functools.lru_cache(maxsize=GRID_CACHE_SIZE)
+def standard_grid(family, shape=(), num_points=GRID_POINTS):
+    dist = getattr(stats, family)
+    x = np.linspace(dist.ppf(GRID_TAIL, *shape), dist.ppf(1 - GRID_TAIL, *shape), num_points)
+    grid = (x, dist.pdf(x, *shape), dist.cdf(x, *shape))
+    for values in grid:
+        values.flags.writeable = False
+    return grid
+
+# Function to get the pdf and cdf grid of a distribution from its cached standardized grid,
+# moved to loc and stretched by scale
+def distribution_grid(family, shape=(), loc=0.0, scale=1.0, num_points=GRID_POINTS):
+    x, pdf, cdf = standard_grid(family, tuple(shape), num_points)
+    return loc + scale * x, pdf / scale, cdf
+
+# Function to evaluate the pdf and cdf exactly at one point; the cached grid is only for plotting
+def pdf_cdf_at(family, x, shape=(), loc=0.0, scale=1.0):
+    z = (x - loc) / scale
+    dist = getattr(stats, family)
+    return dist.pdf(z, *shape) / scale, dist.cdf(z, *shape)
+
+# Function to compute a quantile of a standardized distribution, once per (family, q, shape)
+@functools.lru_cache(maxsize=GRID_CACHE_SIZE)
+def _standard_ppf(family, q, shape=()):
+    return float(getattr(stats, family).ppf(q, *shape))
+
+# Function to get a quantile of a distribution from its cached standardized quantile
+def ppf(family, q, shape=(), loc=0.0, scale=1.0):
+    return loc + scale * _standard_ppf(family, float(q), tuple(shape))
+
+# Function to build the table of upper critical values: one row for the normal distribution,
+# or one row per degree of freedom in TABLE_DF for the t distribution
+@functools.lru_cache(maxsize=None)
+def _critical_table(family):
+    if family == 'norm':
+        return stats.norm.isf(TABLE_TAILS)[None, :]
+    return stats.t.isf(TABLE_TAILS[None, :], TABLE_DF[:, None])
+
+# Function to get the upper critical value cutting off probability tail, from the normal
+# distribution when df is None and from the t distribution with df degrees of freedom
+# otherwise. Values on the table are looked up; anything else falls back to scipy.
+def critical_value(tail, df=None):
+    family = 'norm' if df is None else 't'
+    column = int(round(tail * TABLE_STEPS)) - 1
+    on_table = 0 <= column < len(TABLE_TAILS) and np.isclose(tail, TABLE_TAILS[column], rtol=0, atol=1e-9)
+    if on_table and df is None:
+        return float(_critical_table(family)[0, column])
+    if on_table and df in TABLE_DF:
+        return float(_critical_table(family)[int(df) - 1, column])
+    shape = () if df is None else (df,)
+    return -_standard_ppf(family, float(tail), shape)
@@ -9,20 +9,122 @@ plt.style.use('classic')  # Ensures compatibility
 # Set the number of samples
 num_samples = 10000
 
-# Function to plot the sum, mean, or max of uniform or Laplace random variables
-def plot_statistic(num_vars, distribution, statistic):
+# Largest number of new variables drawn at once when catching up
+max_block_vars = 100
+
+# Function to draw a block of variables (columns) for a number of samples (rows)
+def draw_variables(rng, distribution, num_rows, num_new):
     if distribution == 'Uniform':
-        data = uniform.rvs(size=(num_samples, num_vars))
+        return uniform.rvs(size=(num_rows, num_new), random_state=rng)
     else:  # Laplace
-        data = laplace.rvs(size=(num_samples, num_vars))
-    
+        return laplace.rvs(size=(num_rows, num_new), random_state=rng)
+
+# Function to bring the running sum and max kept in session state up to num_vars variables.
+# Each distribution keeps its own accumulator, so stepping n up by one draws a single column.
+def accumulate(num_vars, distribution):
+    accumulators = st.session_state.setdefault('clt_accumulators', {})
+    acc = accumulators.get(distribution)
+    if acc is None or acc['num_vars'] > num_vars:
+        # Running sums cannot be undone, so stepping n down starts a fresh accumulator
+        acc = {
+            'rng': np.random.default_rng(),
+            'num_vars': 0,
+            'sum': np.zeros(num_samples),
+            'max': np.full(num_samples, -np.inf),
+        }
+        accumulators[distribution] = acc
+
+    while acc['num_vars'] < num_vars:
+        block = draw_variables(acc['rng'], distribution, num_samples, min(num_vars - acc['num_vars'], max_block_vars))
+        acc['sum'] = acc['sum'] + block.sum(axis=1)
+        acc['max'] = np.maximum(acc['max'], block.max(axis=1))
+        acc['num_vars'] += block.shape[1]
+
+    return acc
+
+# Support used for one variable when discretizing its density (Laplace mass beyond ±40 is e^-40)
+single_support = {'Uniform': (0.0, 1.0), 'Laplace': (-40.0, 40.0)}
+
+# Mean and variance of one variable
+single_moments = {'Uniform': (0.5, 1 / 12), 'Laplace': (0.0, 2.0)}
+
+# Number of grid points for the exact densities
+fft_size = 2 ** 16
+
+# Maximum number of points drawn for the exact density curve
+max_curve_points = 1000
+
+# Function to compute the exact density of the sum of n variables on a fine grid.
+# One variable is discretized into cell probabilities; the sum of n of them has the n-th
+# power of their discrete Fourier transform, which np.power forms by repeated squaring,
+# so any n costs one forward and one inverse FFT.
+@st.cache_data
+def exact_sum_density(distribution, num_vars):
+    dist = uniform if distribution == 'Uniform' else laplace
+    a, b = single_support[distribution]
+    mean, var = single_moments[distribution]
+
+    # Window of ±20 standard deviations around the mean of the sum, within its support
+    lo = max(num_vars * mean - 20 * np.sqrt(num_vars * var), num_vars * a)
+    hi = min(num_vars * mean + 20 * np.sqrt(num_vars * var), num_vars * b)
+    # Grid step, rounded down so a whole number of cells spans one variable's support
+    num_cells = int(np.ceil((b - a) * fft_size / max(hi - lo, b - a)))
+    h = (b - a) / num_cells
+
+    cell_probs = np.diff(dist.cdf(a + h * np.arange(num_cells + 1)))
+    sum_probs = np.fft.irfft(np.fft.rfft(cell_probs, fft_size) ** num_vars, fft_size)
+
+    # Cell k of the sum is centred at num_vars * (a + h/2) + k * h; the transform is
+    # circular, so read fft_size cells starting at the window's lower end
+    k = int(np.floor((lo - num_vars * (a + h / 2)) / h)) + np.arange(fft_size)
+    x = num_vars * (a + h / 2) + k * h
+    return x, np.clip(sum_probs[k % fft_size], 0, None) / h
+
+# Function to compute the exact density of the max of n variables, n F(x)^(n-1) f(x)
+def exact_max_density(distribution, num_vars, x):
+    dist = uniform if distribution == 'Uniform' else laplace
+    return num_vars * dist.cdf(x) ** (num_vars - 1) * dist.pdf(x)
+
+# Function to compute the exact density of the chosen statistic over the range [lo, hi]
+def exact_density(distribution, statistic, num_vars, lo, hi):
+    if statistic == 'Max':
+        x = np.linspace(lo, hi, max_curve_points)
+        return x, exact_max_density(distribution, num_vars, x)
+
+    x, p = exact_sum_density(distribution, num_vars)
+    if statistic == 'Mean':
+        x, p = x / num_vars, p * num_vars
+    keep = (x >= lo) & (x <= hi)
+    step = max(np.count_nonzero(keep) // max_curve_points, 1)
+    return x[keep][::step], p[keep][::step]
+
+# Function to fit a Gumbel distribution by maximum likelihood. The scale starts at the
+# method-of-moments estimate and takes a few Newton steps on the profile score equation
+# beta = mean(x) - sum(x w) / sum(w), w = exp(-x / beta); the location then has a closed form.
+def fit_gumbel(x, num_steps=6):
+    z = x - x.mean()
+    beta = x.std() * np.sqrt(6) / np.pi
+    for _ in range(num_steps):
+        w = np.exp(-(z - z.min()) / beta)  # shifted so the largest weight is 1
+        w /= w.sum()
+        weighted_mean = w @ z
+        weighted_var = w @ (z - weighted_mean) ** 2
+        score = beta + weighted_mean
+        beta -= score / (1 + weighted_var / beta ** 2)
+    loc = x.mean() - beta * (np.log(np.mean(np.exp(-(z - z.min()) / beta))) - z.min() / beta)
+    return loc, beta
+
+# Function to plot the sum, mean, or max of uniform or Laplace random variables
+def plot_statistic(num_vars, distribution, statistic):
+    acc = accumulate(num_vars, distribution)
+
     if statistic == 'Sum':
-        stat_data = np.sum(data, axis=1)
+        stat_data = acc['sum']
     elif statistic == 'Mean':
-        stat_data = np.mean(data, axis=1)
+        stat_data = acc['sum'] / num_vars
     elif statistic == 'Max':
-        stat_data = np.max(data, axis=1)
-    
+        stat_data = acc['max']
+
     # Calculate statistics
     data_mean = np.mean(stat_data)
     data_var = np.var(stat_data)
@@ -35,11 +137,21 @@ def plot_statistic(num_vars, distribution, statistic):
         mu, std = norm.fit(stat_data)
         x = np.linspace(mu - 4*std, mu + 4*std, 100)
         p = norm.pdf(x, mu, std)
+        fit_label = 'Fitted Normal'
     else:
-        param = gumbel_r.fit(stat_data)
+        # The max sample for a given n is fixed until the accumulator restarts, so fit it once
+        param = acc.setdefault('gumbel_fits', {}).get(num_vars)
+        if param is None:
+            param = acc['gumbel_fits'][num_vars] = fit_gumbel(stat_data)
         x = np.linspace(min(stat_data), max(stat_data), 100)
         p = gumbel_r.pdf(x, *param)
-    plt.plot(x, p, 'blue', linewidth=2)
+        fit_label = 'Fitted Gumbel'
+    plt.plot(x, p, 'blue', linewidth=2, label=fit_label)
+
+    # Exact density of the statistic over the histogram's range
+    x_exact, p_exact = exact_density(distribution, statistic, num_vars, bins[0], bins[-1])
+    plt.plot(x_exact, p_exact, 'k--', linewidth=2, label='Exact')
+    plt.legend(loc='upper right')
     
     # Annotate statistics on the plot
     plt.annotate(f'Mean: {data_mean:.2f}\nVariance: {data_var:.2f}\nKurtosis: {data_kurtosis:.2f}',
@@ -50,15 +162,140 @@ def plot_statistic(num_vars, distribution, statistic):
     plt.ylabel('Density')
     st.pyplot(plt)  # Use st.pyplot() to render matplotlib plot
 
+# Random values generated per block in streaming mode, which bounds its memory use
+stream_block_values = 2 ** 22
+
+# Number of fixed histogram bins in streaming mode
+stream_bins = 60
+
+# Euler-Mascheroni constant, the mean of the standard Gumbel distribution
+euler_gamma = 0.5772156649015329
+
+# Function to summarize a block of values as (count, mean, M2, M3, M4), Mk being the sum of k-th central powers
+def block_moments(values):
+    d = values - values.mean()
+    d2 = d * d
+    return len(values), values.mean(), d2.sum(), (d2 * d).sum(), (d2 * d2).sum()
+
+# Function to merge the moment sums of two groups of values (Pébay's pairwise update)
+def merge_moments(a, b):
+    n_a, mean_a, m2_a, m3_a, m4_a = a
+    n_b, mean_b, m2_b, m3_b, m4_b = b
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+    m3 = (m3_a + m3_b + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+          + 3 * delta * (n_a * m2_b - n_b * m2_a) / n)
+    m4 = (m4_a + m4_b + delta ** 4 * n_a * n_b * (n_a ** 2 - n_a * n_b + n_b ** 2) / n ** 3
+          + 6 * delta ** 2 * (n_a ** 2 * m2_b + n_b ** 2 * m2_a) / n ** 2
+          + 4 * delta * (n_a * m3_b - n_b * m3_a) / n)
+    return n, mean, m2, m3, m4
+
+# Function to choose a fixed histogram range before any data is seen
+def stream_range(distribution, num_vars, statistic):
+    dist = uniform if distribution == 'Uniform' else laplace
+    if statistic == 'Sum':
+        a, b = single_support[distribution]
+        mean, var = single_moments[distribution]
+        half_width = 8 * np.sqrt(num_vars * var)
+        return max(num_vars * mean - half_width, num_vars * a), min(num_vars * mean + half_width, num_vars * b)
+    # The max of n variables has quantile function F^-1(u^(1/n))
+    return dist.ppf(1e-6 ** (1 / num_vars)), dist.ppf((1 - 1e-6) ** (1 / num_vars))
+
+# Function to stream num_stream_samples samples in blocks of rows, keeping only running
+# moments and fixed-bin histogram counts of the sum and the max of each row
+@st.cache_data(show_spinner="Streaming samples...")
+def stream_statistics(distribution, num_vars, num_stream_samples):
+    rng = np.random.default_rng()
+    rows_per_block = max(stream_block_values // num_vars, 1)
+
+    results = {}
+    for statistic in ('Sum', 'Max'):
+        results[statistic] = {
+            'moments': None,
+            'edges': np.linspace(*stream_range(distribution, num_vars, statistic), stream_bins + 1),
+            'counts': np.zeros(stream_bins, dtype=np.int64),
+        }
+
+    for start in range(0, num_stream_samples, rows_per_block):
+        block = draw_variables(rng, distribution, min(rows_per_block, num_stream_samples - start), num_vars)
+        for statistic, values in (('Sum', block.sum(axis=1)), ('Max', block.max(axis=1))):
+            result = results[statistic]
+            moments = block_moments(values)
+            result['moments'] = moments if result['moments'] is None else merge_moments(result['moments'], moments)
+            result['counts'] += np.histogram(values, result['edges'])[0]
+
+    return results
+
+# Function to plot the sum, mean, or max from streamed moments and histogram counts
+def plot_streamed_statistic(num_vars, distribution, statistic, num_stream_samples):
+    result = stream_statistics(distribution, num_vars, num_stream_samples)['Max' if statistic == 'Max' else 'Sum']
+    n, data_mean, m2, m3, m4 = result['moments']
+    edges = result['edges']
+    data_var = m2 / n
+    data_kurtosis = n * m4 / m2 ** 2 - 3
+
+    # The mean is the sum rescaled by 1/n
+    if statistic == 'Mean':
+        edges = edges / num_vars
+        data_mean, data_var = data_mean / num_vars, data_var / num_vars ** 2
+
+    density = result['counts'] / (n * np.diff(edges))
+    outside = n - result['counts'].sum()
+
+    plt.figure(figsize=(10, 6))
+    plt.bar(edges[:-1], density, width=np.diff(edges), align='edge', alpha=0.6, color='orangered', edgecolor='black')
+
+    # Fit from the streamed moments; the Gumbel is matched by the method of moments
+    data_std = np.sqrt(data_var)
+    x = np.linspace(edges[0], edges[-1], 200)
+    if statistic != 'Max':
+        p = norm.pdf(x, data_mean, data_std)
+        fit_label = 'Fitted Normal'
+    else:
+        scale = data_std * np.sqrt(6) / np.pi
+        p = gumbel_r.pdf(x, data_mean - euler_gamma * scale, scale)
+        fit_label = 'Fitted Gumbel'
+    plt.plot(x, p, 'blue', linewidth=2, label=fit_label)
+
+    x_exact, p_exact = exact_density(distribution, statistic, num_vars, edges[0], edges[-1])
+    plt.plot(x_exact, p_exact, 'k--', linewidth=2, label='Exact')
+    plt.legend(loc='upper right')
+
+    plt.annotate(f'Samples: {n:,}\nMean: {data_mean:.2f}\nVariance: {data_var:.2f}\nKurtosis: {data_kurtosis:.2f}',
+                 xy=(0.05, 0.95), xycoords='axes fraction', bbox=dict(boxstyle="round,pad=0.5", fc="greenyellow", ec="black", lw=2), fontsize=10)
+
+    plt.title(f'{statistic} of {num_vars} {distribution} Variables')
+    plt.xlabel(f'{statistic} Value')
+    plt.ylabel('Density')
+    st.pyplot(plt)
+    if outside:
+        st.caption(f'{outside:,} samples fell outside the histogram range; they are included in the moments.')
+
 # Streamlit UI components
 st.image("math_horiz.png", use_column_width=True)
 st.title("Central Limit Theorem Visualization")
 num_vars = st.sidebar.number_input("Number of Variables:", min_value=1, value=1, step=1)
 distribution = st.sidebar.selectbox("Distribution:", ['Uniform', 'Laplace'])
 statistic = st.sidebar.radio("Statistic:", ['Sum', 'Mean', 'Max'])
+mode = st.sidebar.radio("Mode:", ['Interactive', 'Streaming'],
+                        help="Streaming generates the samples in blocks and keeps only running moments and histogram counts, so memory stays constant.")
 
-# Trigger re-plotting when the user changes any input
-plot_statistic(num_vars, distribution, statistic)
+if mode == 'Interactive':
+    # Trigger re-plotting when the user changes any input
+    plot_statistic(num_vars, distribution, statistic)
+else:
+    num_stream_samples = st.sidebar.number_input("Number of Samples:", min_value=10000, max_value=10**9, value=10**6, step=10**6)
+    # Streaming runs can be long, so they only start on request
+    if st.sidebar.button("Run Streaming Simulation"):
+        st.session_state['clt_stream_params'] = (num_vars, distribution, int(num_stream_samples))
+    params = st.session_state.get('clt_stream_params')
+    if params is None:
+        st.info("Choose the number of samples and press **Run Streaming Simulation**.")
+    else:
+        stream_vars, stream_distribution, stream_samples = params
+        plot_streamed_statistic(stream_vars, stream_distribution, statistic, stream_samples)
 
 st.markdown('---')
 st.markdown('*Created by Dr. Jishan Ahmed*')
@@ -1,7 +1,18 @@
+import io
+import os
+import sys
+import tempfile
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from scipy.stats import ks_2samp
+import plotly.graph_objects as go
+from scipy.stats import kstwo
+# The shared helpers live in apps/, one level above this app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from column_profiler import file_digest
+from ks_engine import (KLLSketch, ecdf_quantiles, external_sort, ks_all_pairs, ks_from_sketches, ks_max_location,
+                       ks_statistic_sorted, ks_test_sorted, sketch_column, sorted_numeric_columns)
 
 # Function to load data
 def load_data(uploaded_file):
@@ -13,6 +24,114 @@ def load_data(uploaded_file):
         return df
     return None
 
+# Function to read only the column names of a file
+def load_columns(uploaded_file):
+    uploaded_file.seek(0)
+    if uploaded_file.name.endswith('.xlsx'):
+        return pd.read_excel(uploaded_file, nrows=0).columns
+    return pd.read_csv(uploaded_file, nrows=0).columns
+
+# Function to get the numeric values of a column, sorted, with missing values dropped
+def sorted_values(df, column):
+    values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+    return np.sort(values[~np.isnan(values)])
+
+# Function to bin a sample on the server so only the bars are sent to the browser
+def histogram_figure(values, color, title, xaxis_title):
+    counts, edges = np.histogram(values, bins=50)
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), marker_color=color))
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title='count', bargap=0)
+    return fig
+
+# Function to overlay the ECDFs of both samples, drawn from downsampled quantiles, and mark
+# where they are furthest apart, which is the KS statistic
+def ecdf_figure(sorted_1, sorted_2, column1, column2):
+    fig = go.Figure()
+    for values, color, name in [(sorted_1, 'blue', f'{column1} (Dataset 1)'), (sorted_2, 'magenta', f'{column2} (Dataset 2)')]:
+        x, y = ecdf_quantiles(values)
+        fig.add_trace(go.Scatter(x=x, y=y, mode='lines', line=dict(color=color, shape='hv'), name=name))
+
+    x, cdf_1, cdf_2 = ks_max_location(sorted_1, sorted_2)
+    fig.add_trace(go.Scatter(x=[x, x], y=[cdf_1, cdf_2], mode='lines+markers', line=dict(color='black', dash='dash'),
+                             name=f'KS maximum: {abs(cdf_1 - cdf_2):.4f} at {x:.4g}'))
+    fig.update_layout(title='Empirical CDFs', xaxis_title='Value', yaxis_title='Cumulative probability')
+    return fig
+
+# Function to run the two-sample KS test without loading either file: each column is sorted
+# externally into spill files, then the two sorted runs are merged to find the statistic
+def out_of_core_ks_test(file_1, column1, file_2, column2):
+    with tempfile.TemporaryDirectory() as spill_dir:
+        sorted_1 = external_sort(file_1, file_1.name, column1, spill_dir, 'dataset1')
+        sorted_2 = external_sort(file_2, file_2.name, column2, spill_dir, 'dataset2')
+        n1, n2 = len(sorted_1), len(sorted_2)
+        ks_statistic = ks_statistic_sorted(sorted_1, sorted_2)
+        del sorted_1, sorted_2  # release the memory maps before the spill files are removed
+    if n1 == 0 or n2 == 0:
+        return ks_statistic, np.nan, n1, n2
+    # Same asymptotic p-value as ks_2samp uses for large samples
+    ks_pvalue = kstwo.sf(ks_statistic, np.round(n1 * n2 / (n1 + n2)))
+    return ks_statistic, ks_pvalue, n1, n2
+
+# Function to report the test result
+def show_ks_result(column1, column2, ks_statistic, ks_pvalue):
+    st.write(f"Kolmogorov-Smirnov Test Results for {column1} vs. {column2}:")
+    st.write(f"Statistic: {ks_statistic}, P-value: {ks_pvalue}")
+
+    if ks_pvalue < 0.05:
+        st.success(f"The distributions of {column1} and {column2} are significantly different (p < 0.05).")
+    else:
+        st.info(f"No significant difference found in the distributions of {column1} and {column2} (p >= 0.05).")
+
+# Function to test every requested pair of numeric columns, sorting each column only once
+def all_pairs_ks_test(dataset1, dataset2, pairing, num_workers):
+    columns_1 = sorted_numeric_columns(dataset1)
+    columns_2 = sorted_numeric_columns(dataset2)
+    if pairing == 'Matching names':
+        pairs = [(column, column) for column in columns_1 if column in columns_2]
+    else:
+        pairs = [(column1, column2) for column1 in columns_1 for column2 in columns_2]
+    return ks_all_pairs(columns_1, columns_2, pairs, num_workers)
+
+# Function to show the all-pairs results as a heatmap of KS statistics and a sortable table
+def show_all_pairs_result(results, pairing):
+    if results.empty:
+        st.warning("No pairs of numeric columns to compare.")
+        return
+
+    if pairing == 'Matching names':
+        matrix = results.set_index('Column 1')[['Statistic']].T
+        matrix.index = ['KS statistic']
+    else:
+        matrix = results.pivot(index='Column 1', columns='Column 2', values='Statistic')
+    fig = px.imshow(matrix, color_continuous_scale='Reds', zmin=0, aspect='auto',
+                    labels=dict(x='Dataset 2', y='Dataset 1', color='KS statistic'),
+                    title='Kolmogorov-Smirnov Statistic by Column Pair')
+    st.plotly_chart(fig, use_container_width=True)
+
+    significant = results['P-value'] < 0.05
+    st.write(f"{significant.sum():,} of {len(results):,} pairs differ significantly (p < 0.05).")
+    st.dataframe(results.assign(**{'Significant (p < 0.05)': significant}).sort_values('Statistic', ascending=False),
+                 use_container_width=True, hide_index=True)
+
+# Function to sketch a column of an uploaded file in one pass, cached by file contents
+@st.cache_data(show_spinner='Sketching column...')
+def cached_sketch(file_bytes, file_name, column):
+    return sketch_column(io.BytesIO(file_bytes), file_name, column).to_bytes()
+
+# Function to compare two sketches and report the approximate test result
+def show_sketch_result(label1, label2, sketch_1, sketch_2):
+    n1, n2 = sketch_1.n, sketch_2.n
+    if n1 == 0 or n2 == 0:
+        st.warning("Both selected columns need numeric values to compare.")
+        return
+    ks_statistic, error_bound = ks_from_sketches(sketch_1, sketch_2)
+    ks_pvalue = kstwo.sf(ks_statistic, np.round(n1 * n2 / (n1 + n2)))
+    st.write(f"Approximate Kolmogorov-Smirnov Test Results for {label1} vs. {label2} "
+             f"({n1:,} vs. {n2:,} values):")
+    st.write(f"Statistic: {ks_statistic:.5f} ± {error_bound:.5f}, P-value: {ks_pvalue}")
+    st.caption("The error bound holds with about 99% probability at any one point of the CDFs; "
+               "the p-value is computed from the estimated statistic.")
+
 st.set_page_config(page_title="Dataset Distribution Comparison", layout="wide")
 st.title('Dataset Distribution Comparison App')
 st.markdown("This app compares the distributions of two datasets using the Kolmogorov-Smirnov test.")
@@ -21,41 +140,100 @@ st.markdown("This app compares the distributions of two datasets using the Kolmo
 uploaded_file_1 = st.sidebar.file_uploader("Choose Dataset 1 (CSV or Excel)", type=['csv', 'xlsx'], key='file1')
 uploaded_file_2 = st.sidebar.file_uploader("Choose Dataset 2 (CSV or Excel)", type=['csv', 'xlsx'], key='file2')
 
-# Load the datasets
-dataset1 = load_data(uploaded_file_1)
-dataset2 = load_data(uploaded_file_2)
-
-# Select columns to compare
-if dataset1 is not None and dataset2 is not None:
-    column1 = st.sidebar.selectbox('Select the column from Dataset 1 to compare', dataset1.columns, key='col1')
-    column2 = st.sidebar.selectbox('Select the column from Dataset 2 to compare', dataset2.columns, key='col2')
-    
-    # Plotting the distribution of the selected columns
-    fig1 = px.histogram(dataset1, x=column1, nbins=50, color_discrete_sequence=['blue'], title=f'Distribution of {column1} in Dataset 1')
-    fig2 = px.histogram(dataset2, x=column2, nbins=50, color_discrete_sequence=['magenta'], title=f'Distribution of {column2} in Dataset 2')
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.plotly_chart(fig1, use_container_width=True)
-    with col2:
-        st.plotly_chart(fig2, use_container_width=True)
-    
-    # Compare distributions for the selected column
-    if st.sidebar.button('Perform Kolmogorov-Smirnov Test'):
-        ks_statistic, ks_pvalue = ks_2samp(dataset1[column1], dataset2[column2])
-        
-        st.write(f"Kolmogorov-Smirnov Test Results for {column1} vs. {column2}:")
-        st.write(f"Statistic: {ks_statistic}, P-value: {ks_pvalue}")
-        
-        if ks_pvalue < 0.05:
-            st.success(f"The distributions of {column1} and {column2} are significantly different (p < 0.05).")
+mode = st.sidebar.radio('Mode', ['In-memory', 'Out-of-core', 'All pairs', 'Sketch'],
+                        help='Out-of-core reads only the selected columns in chunks and sorts them on disk, for files too large to load. '
+                             'All pairs tests every numeric column of Dataset 1 against the matching or every column of Dataset 2. '
+                             'Sketch compares compact quantile sketches, which can be saved and reused as a reference.')
+
+if mode == 'Out-of-core':
+    if uploaded_file_1 is not None and uploaded_file_2 is not None:
+        column1 = st.sidebar.selectbox('Select the column from Dataset 1 to compare', load_columns(uploaded_file_1), key='col1')
+        column2 = st.sidebar.selectbox('Select the column from Dataset 2 to compare', load_columns(uploaded_file_2), key='col2')
+
+        if st.sidebar.button('Perform Kolmogorov-Smirnov Test'):
+            with st.spinner('Sorting columns on disk...'):
+                ks_statistic, ks_pvalue, n1, n2 = out_of_core_ks_test(uploaded_file_1, column1, uploaded_file_2, column2)
+            if n1 == 0 or n2 == 0:
+                st.warning("Both selected columns need numeric values to compare.")
+            else:
+                st.write(f"Compared {n1:,} values of {column1} with {n2:,} values of {column2}.")
+                show_ks_result(column1, column2, ks_statistic, ks_pvalue)
+elif mode == 'All pairs':
+    dataset1 = load_data(uploaded_file_1)
+    dataset2 = load_data(uploaded_file_2)
+
+    if dataset1 is not None and dataset2 is not None:
+        pairing = st.sidebar.radio('Pair columns by', ['Matching names', 'Every column'])
+        num_workers = st.sidebar.number_input('Worker processes', min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1)
+
+        digest = (file_digest(uploaded_file_1.getvalue()), file_digest(uploaded_file_2.getvalue()))
+        if st.sidebar.button('Perform Kolmogorov-Smirnov Tests'):
+            with st.spinner('Testing column pairs...'):
+                st.session_state['ks_all_pairs'] = (digest, all_pairs_ks_test(dataset1, dataset2, pairing, num_workers), pairing)
+
+        # Keep the last results for these files on screen while the table is sorted or explored
+        if st.session_state.get('ks_all_pairs', (None,))[0] == digest:
+            show_all_pairs_result(*st.session_state['ks_all_pairs'][1:])
+elif mode == 'Sketch':
+    reference_file = st.sidebar.file_uploader("Or choose a saved reference sketch for Dataset 1 (.npz)", type=['npz'], key='sketch1')
+
+    sketch_1 = None
+    if reference_file is not None:
+        sketch_1 = KLLSketch.from_bytes(reference_file.getvalue())
+        label1 = reference_file.name
+    elif uploaded_file_1 is not None:
+        column1 = st.sidebar.selectbox('Select the column from Dataset 1 to compare', load_columns(uploaded_file_1), key='col1')
+        sketch_1 = KLLSketch.from_bytes(cached_sketch(uploaded_file_1.getvalue(), uploaded_file_1.name, column1))
+        label1 = column1
+        st.sidebar.download_button('Save Dataset 1 sketch', sketch_1.to_bytes(), file_name=f'{column1}_sketch.npz')
+
+    if uploaded_file_2 is not None:
+        column2 = st.sidebar.selectbox('Select the column from Dataset 2 to compare', load_columns(uploaded_file_2), key='col2')
+        sketch_2 = KLLSketch.from_bytes(cached_sketch(uploaded_file_2.getvalue(), uploaded_file_2.name, column2))
+        st.sidebar.download_button('Save Dataset 2 sketch', sketch_2.to_bytes(), file_name=f'{column2}_sketch.npz')
+
+        if sketch_1 is not None:
+            show_sketch_result(label1, column2, sketch_1, sketch_2)
+
+    if sketch_1 is None or uploaded_file_2 is None:
+        st.markdown("Please upload Dataset 1 or a saved reference sketch, and Dataset 2, to compare their distributions.")
+else:
+    # Load the datasets
+    dataset1 = load_data(uploaded_file_1)
+    dataset2 = load_data(uploaded_file_2)
+
+    # Select columns to compare
+    if dataset1 is not None and dataset2 is not None:
+        column1 = st.sidebar.selectbox('Select the column from Dataset 1 to compare', dataset1.columns, key='col1')
+        column2 = st.sidebar.selectbox('Select the column from Dataset 2 to compare', dataset2.columns, key='col2')
+
+        sorted_1 = sorted_values(dataset1, column1)
+        sorted_2 = sorted_values(dataset2, column2)
+
+        if len(sorted_1) == 0 or len(sorted_2) == 0:
+            st.warning("Both selected columns need numeric values to compare.")
         else:
-            st.info(f"No significant difference found in the distributions of {column1} and {column2} (p >= 0.05).")
+            # Plotting the distribution of the selected columns
+            fig1 = histogram_figure(sorted_1, 'blue', f'Distribution of {column1} in Dataset 1', column1)
+            fig2 = histogram_figure(sorted_2, 'magenta', f'Distribution of {column2} in Dataset 2', column2)
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.plotly_chart(fig1, use_container_width=True)
+            with col2:
+                st.plotly_chart(fig2, use_container_width=True)
+
+            st.plotly_chart(ecdf_figure(sorted_1, sorted_2, column1, column2), use_container_width=True)
+
+            # Compare distributions for the selected column
+            if st.sidebar.button('Perform Kolmogorov-Smirnov Test'):
+                ks_statistic, ks_pvalue = ks_test_sorted(sorted_1, sorted_2)
+                show_ks_result(column1, column2, ks_statistic, ks_pvalue)
 
 # Signature
 st.sidebar.markdown("---")
 st.sidebar.markdown("Created by Dr. Jishan Ahmed")
 
 # In case no file is uploaded
-if not uploaded_file_1 or not uploaded_file_2:
+if mode != 'Sketch' and (not uploaded_file_1 or not uploaded_file_2):
     st.markdown("Please upload datasets to compare their distributions.")
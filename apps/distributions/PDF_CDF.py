@@ -1,16 +1,16 @@
 import streamlit as st
 import matplotlib.pyplot as plt
-import numpy as np
-from scipy.stats import norm
+import os
+import sys
+# The shared distribution cache lives in apps/, one level above this app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from distribution_cache import distribution_grid, pdf_cdf_at
 
 # Function for the interactive PDF and CDF plots
 def interactive_pdf_cdf(mu=0, sigma=1, x_point=0):
-    x = np.linspace(norm.ppf(0.001, mu, sigma), norm.ppf(0.999, mu, sigma), 1000)
-    pdf = norm.pdf(x, mu, sigma)
-    cdf = norm.cdf(x, mu, sigma)
+    x, pdf, cdf = distribution_grid('norm', loc=mu, scale=sigma)
 
-    pdf_val = norm.pdf(x_point, mu, sigma)
-    cdf_val = norm.cdf(x_point, mu, sigma)
+    pdf_val, cdf_val = pdf_cdf_at('norm', x_point, loc=mu, scale=sigma)
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
 
@@ -1,15 +1,30 @@
+import io
+import os
 import streamlit as st
-import pandas as pd
 import numpy as np
-from scipy.stats import poisson
 import matplotlib.pyplot as plt
+from poisson_engine import MODELS, confidence_intervals, count_table, fit_lambda, read_count_table, sufficient_statistics
 
-# Function to calculate MLE and create plot
-def mle_plot(data):
-    lambda_estimate = np.mean(data)
-    lambda_range = np.linspace(0.1, 10, 200)
-    likelihoods = [np.prod([poisson.pmf(k, lambda_val) for k in data]) for lambda_val in lambda_range]
-    data_hist, bins = np.histogram(data, bins=range(int(np.max(data)) + 2), density=True)
+# Function to read the counts of an uploaded file into a frequency table, cached by file contents
+@st.cache_data(show_spinner='Reading counts...')
+def load_count_table(file_bytes, file_name):
+    return read_count_table(io.BytesIO(file_bytes), file_name)
+
+# Function to compute the confidence intervals for λ, cached so reruns reuse the bootstrap
+@st.cache_data(show_spinner='Bootstrapping...')
+def cached_confidence_intervals(table, confidence, num_replicates, seed, num_workers):
+    return confidence_intervals(table, confidence, num_replicates, seed, num_workers)
+
+# Function to calculate MLE and create plot from the frequency table of the counts
+def mle_plot(table, model_name='Poisson', shape=None):
+    model = MODELS[model_name]
+    stats = sufficient_statistics(table)
+    lambda_estimate = fit_lambda(stats, model_name, shape)
+    lambda_range = np.linspace(0.1, max(10, 2 * lambda_estimate), 200)
+    # Likelihood relative to its maximum, computed on the log scale so it never underflows
+    log_likelihoods = model['log_likelihood'](stats, lambda_range, shape)
+    likelihoods = np.exp(log_likelihoods - model['log_likelihood'](stats, lambda_estimate, shape))
+    counts = np.arange(len(table))
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 7))
 
@@ -18,13 +33,13 @@ def mle_plot(data):
     ax1.axvline(x=lambda_estimate, color='tab:red', linestyle='--', label=f'Estimated λ: {lambda_estimate:.2f}')
     ax1.set_title('MLE Computation')
     ax1.set_xlabel('λ Value')
-    ax1.set_ylabel('Likelihood')
+    ax1.set_ylabel('Relative Likelihood L(λ) / L(λ̂)')
     ax1.legend()
 
     # Data distribution plot
-    ax2.bar(bins[:-1], data_hist, width=0.5, color='tab:orange', alpha=0.6, label='Data Histogram')
-    poisson_dist = [poisson.pmf(k, lambda_estimate) for k in range(len(bins)-1)]
-    ax2.plot(poisson_dist, color='tab:blue', marker='o', linestyle='-', lw=2, label=f'Poisson Dist (λ: {lambda_estimate:.2f})')
+    ax2.bar(counts, table / stats['n'], width=0.5, color='tab:orange', alpha=0.6, label='Data Histogram')
+    fitted_dist = model['pmf'](counts, lambda_estimate, shape)
+    ax2.plot(counts, fitted_dist, color='tab:blue', marker='o', linestyle='-', lw=2, label=f'{model_name} Dist (λ: {lambda_estimate:.2f})')
     ax2.set_title('Observed Data Distribution')
     ax2.set_xlabel('Number of Cases')
     ax2.set_ylabel('Probability/Frequency')
@@ -39,30 +54,49 @@ st.markdown("<h1 style='text-align: center; color: blue;'>Poisson MLE Visualizat
 # Data input options: file upload or manual list entry
 data_input_mode = st.radio("Choose how to input data:", ['Upload a file', 'Enter a list of numbers'])
 
-data = None
+table = None
 
 if data_input_mode == 'Upload a file':
     uploaded_file = st.file_uploader("Upload your data file (CSV or Excel)", type=["csv", "xlsx"])
     if uploaded_file is not None:
-        # Read the file into a pandas dataframe
-        if uploaded_file.name.endswith('.csv'):
-            data = pd.read_csv(uploaded_file)
-        else:
-            data = pd.read_excel(uploaded_file)
-        data = data.iloc[:, 0].tolist()  # Assuming the data is in the first column
+        # Stream the first column into a frequency table instead of loading every row
+        try:
+            table = load_count_table(uploaded_file.getvalue(), uploaded_file.name)
+        except ValueError as error:
+            st.error(f"Please upload counts in the first column. {error}")
 
 elif data_input_mode == 'Enter a list of numbers':
     numbers_input = st.text_area("Enter a list of numbers, separated by commas:")
     if numbers_input:
         try:
-            data = [float(num.strip()) for num in numbers_input.split(',')]
-        except ValueError:
-            st.error("Please enter valid numbers, separated by commas.")
+            table = count_table([float(num.strip()) for num in numbers_input.split(',')])
+        except ValueError as error:
+            st.error(f"Please enter valid counts, separated by commas. {error}")
+
+# Count model to fit, with its extra shape parameter held at the slider value
+model_name = st.selectbox('Count model', list(MODELS))
+shape = None
+if MODELS[model_name]['shape'] is not None:
+    label, low, high, default = MODELS[model_name]['shape']
+    shape = st.slider(label, low, high, default)
+
+# Settings for the confidence intervals of the Poisson λ
+if model_name == 'Poisson':
+    col1, col2, col3, col4 = st.columns(4)
+    confidence = col1.slider('Confidence Level', 0.80, 0.99, 0.95, 0.01)
+    num_replicates = col2.number_input('Bootstrap Replicates', min_value=100, max_value=100000, value=10000, step=1000)
+    seed = col3.number_input('Random Seed', min_value=0, value=42)
+    num_workers = col4.number_input('Worker Processes', min_value=1, max_value=os.cpu_count() or 1, value=1)
 
 # Compute MLE and plot
-if data is not None and st.button('Compute MLE and Show Plot'):
-    fig = mle_plot(data)
+if table is not None and len(table) and st.button('Compute MLE and Show Plot'):
+    fig = mle_plot(table, model_name, shape)
     st.pyplot(fig)
 
+    if model_name == 'Poisson':
+        st.markdown(f"**{confidence:.0%} confidence intervals for λ**")
+        intervals = cached_confidence_intervals(table, confidence, int(num_replicates), int(seed), int(num_workers))
+        st.dataframe(intervals.round(4), hide_index=True)
+
 # Signature
 st.markdown("<h4 style='text-align: center; color: purple;'>Created by Dr. Jishan Ahmed</h4>", unsafe_allow_html=True)
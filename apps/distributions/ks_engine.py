@@ -0,0 +1,279 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from scipy.stats import ks_2samp, kstwo
+
+# Rows of one column read from a file at a time
+CHUNK_ROWS = 1_000_000
+
+# Values held in memory per sorted run while merging
+MERGE_BLOCK = 2 ** 22
+
+# Largest sample size for which ks_2samp computes an exact p-value by default
+EXACT_MAX_N = 10000
+
+# Points kept of each ECDF when it is drawn
+ECDF_POINTS = 500
+
+# Sorted columns of the two datasets, set once in each worker process of the all-pairs pool
+_worker_columns = None
+
+# Function to read the numeric values of one column from a CSV or Excel file, chunk by chunk
+def read_column_chunks(file, file_name, column, chunk_rows=CHUNK_ROWS):
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    if file_name.endswith('.xlsx'):
+        # Excel cannot be read in chunks, but only the one column is loaded
+        chunks = [pd.read_excel(file, usecols=[column])]
+    else:
+        chunks = pd.read_csv(file, usecols=[column], chunksize=chunk_rows)
+    for chunk in chunks:
+        values = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=np.float64)
+        yield values[~np.isnan(values)]
+
+# Function to merge sorted runs saved as .npy files into one sorted .npy file, a block per run at a time
+def merge_runs(run_paths, out_path, block=MERGE_BLOCK):
+    runs = [np.load(path, mmap_mode='r') for path in run_paths]
+    total = sum(len(run) for run in runs)
+    out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float64, shape=(total,))
+    per_run = max(block // len(runs), 1024)
+    positions = [0] * len(runs)
+    written = 0
+
+    while written < total:
+        windows = [run[pos:pos + per_run] for run, pos in zip(runs, positions)]
+        # Everything up to the smallest window end is final, whichever run it comes from
+        bound = min(window[-1] for window in windows if len(window))
+        taken = []
+        for i, window in enumerate(windows):
+            count = np.searchsorted(window, bound, side='right')
+            taken.append(window[:count])
+            positions[i] += count
+        merged = np.sort(np.concatenate(taken))
+        out[written:written + len(merged)] = merged
+        written += len(merged)
+
+    out.flush()
+    del out
+    return total
+
+# Function to sort one column of a file externally: each chunk is sorted and spilled to
+# spill_dir as its own run, then the runs are merged into a single sorted file
+def external_sort(file, file_name, column, spill_dir, prefix):
+    run_paths = []
+    for values in read_column_chunks(file, file_name, column):
+        if len(values):
+            path = os.path.join(spill_dir, f'{prefix}_run{len(run_paths)}.npy')
+            np.save(path, np.sort(values))
+            run_paths.append(path)
+
+    out_path = os.path.join(spill_dir, f'{prefix}_sorted.npy')
+    if not run_paths:
+        np.save(out_path, np.zeros(0))
+    elif len(run_paths) == 1:
+        os.replace(run_paths[0], out_path)
+    else:
+        merge_runs(run_paths, out_path)
+        for path in run_paths:
+            os.remove(path)
+    return np.load(out_path, mmap_mode='r')
+
+# Function to compute the exact two-sample KS statistic of two sorted arrays (in memory or
+# memory-mapped) with a streaming merge that holds at most one block of each in memory. The
+# statistic is undefined, and NaN is returned, when either array is empty.
+def ks_statistic_sorted(sorted_1, sorted_2, block=MERGE_BLOCK):
+    n1, n2 = len(sorted_1), len(sorted_2)
+    if n1 == 0 or n2 == 0:
+        return np.nan
+    i = j = 0
+    d = 0.0
+
+    while i < n1 or j < n2:
+        a = np.asarray(sorted_1[i:i + block])
+        b = np.asarray(sorted_2[j:j + block])
+        bound = min(a[-1] if len(a) else np.inf, b[-1] if len(b) else np.inf)
+
+        # Below the bound both blocks hold every remaining value, so the ECDFs are exact there
+        a_below = a[a < bound]
+        b_below = b[b < bound]
+        if len(a_below) or len(b_below):
+            values = np.union1d(a_below, b_below)
+            cdf_1 = (i + np.searchsorted(a_below, values, side='right')) / n1
+            cdf_2 = (j + np.searchsorted(b_below, values, side='right')) / n2
+            d = max(d, np.abs(cdf_1 - cdf_2).max())
+
+        # At the bound itself, count its ties over the whole arrays
+        i = int(np.searchsorted(sorted_1, bound, side='right'))
+        j = int(np.searchsorted(sorted_2, bound, side='right'))
+        d = max(d, abs(i / n1 - j / n2))
+
+    return d
+
+# Function to sort every numeric column of a DataFrame once, dropping missing values
+def sorted_numeric_columns(df):
+    return {
+        column: np.sort(df[column].dropna().to_numpy(dtype=np.float64))
+        for column in df.select_dtypes(include='number').columns
+    }
+
+# Function to downsample the ECDF of a sorted array to evenly spaced quantiles, always
+# keeping the smallest and largest values
+def ecdf_quantiles(sorted_values, num_points=ECDF_POINTS):
+    n = len(sorted_values)
+    index = np.unique(np.linspace(0, n - 1, min(num_points, n)).round().astype(int))
+    return np.asarray(sorted_values[index]), (index + 1) / n
+
+# Function to find where the ECDFs of two sorted arrays are furthest apart, with both
+# ECDF values there
+def ks_max_location(sorted_1, sorted_2):
+    values = np.concatenate([sorted_1, sorted_2])
+    cdf_1 = np.searchsorted(sorted_1, values, side='right') / len(sorted_1)
+    cdf_2 = np.searchsorted(sorted_2, values, side='right') / len(sorted_2)
+    i = np.argmax(np.abs(cdf_1 - cdf_2))
+    return values[i], cdf_1[i], cdf_2[i]
+
+# Function to run the two-sample KS test on two already sorted arrays, with the same
+# p-value ks_2samp would give: exact for small samples, asymptotic otherwise
+def ks_test_sorted(sorted_1, sorted_2):
+    n1, n2 = len(sorted_1), len(sorted_2)
+    if n1 == 0 or n2 == 0:
+        return np.nan, np.nan
+    if max(n1, n2) <= EXACT_MAX_N:
+        result = ks_2samp(sorted_1, sorted_2)
+        return result.statistic, result.pvalue
+    values = np.concatenate([sorted_1, sorted_2])
+    cdf_1 = np.searchsorted(sorted_1, values, side='right') / n1
+    cdf_2 = np.searchsorted(sorted_2, values, side='right') / n2
+    statistic = np.abs(cdf_1 - cdf_2).max()
+    return statistic, kstwo.sf(statistic, np.round(n1 * n2 / (n1 + n2)))
+
+# Function to hand the sorted columns to a worker process once, instead of with every task
+def _init_worker(columns_1, columns_2):
+    global _worker_columns
+    _worker_columns = (columns_1, columns_2)
+
+# Function to test a batch of (column 1, column 2) pairs inside a worker process
+def _ks_pair_batch(pairs):
+    columns_1, columns_2 = _worker_columns
+    return [(c1, c2, *ks_test_sorted(columns_1[c1], columns_2[c2])) for c1, c2 in pairs]
+
+# Function to run the KS test for every pair of columns, spreading batches of pairs over a
+# process pool. Returns a DataFrame with one row per pair.
+def ks_all_pairs(columns_1, columns_2, pairs, num_workers=1):
+    if num_workers > 1 and len(pairs) > 1:
+        batch_size = -(-len(pairs) // (4 * num_workers))
+        batches = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(columns_1, columns_2)) as pool:
+            rows = [row for batch in pool.map(_ks_pair_batch, batches) for row in batch]
+    else:
+        _init_worker(columns_1, columns_2)
+        rows = _ks_pair_batch(pairs)
+    return pd.DataFrame(rows, columns=['Column 1', 'Column 2', 'Statistic', 'P-value'])
+
+# Default KLL accuracy parameter; larger k means a larger, more accurate sketch
+SKETCH_K = 2000
+
+# Two-sided 99% normal quantile used for the sketch error bound
+SKETCH_Z = 2.576
+
+# A KLL quantile sketch. Level h holds items that each stand for 2^h original values; a level
+# that outgrows its capacity is sorted and every other item, from a random offset, moves up a
+# level. Each such compaction at level h moves any rank by 0 or ±2^h with equal probability,
+# so the sketch tracks the variance it has added to compute an error bound for the CDF.
+class KLLSketch:
+    def __init__(self, k=SKETCH_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.variance = 0.0
+        self.levels = [np.zeros(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        return max(int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))), 2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.zeros(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.variance += other.variance
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) >= self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                items = np.sort(items)
+                # An odd item out stays behind so the compacted part has even length
+                keep, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.variance += float(2 ** level) ** 2
+            level += 1
+
+    # Function to get the sketch's items sorted, with the cumulative weight (approximate rank) of each
+    def cumulative_weights(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def cdf(self, x):
+        if self.n == 0:
+            return np.full(np.shape(x), np.nan)
+        items, cumulative = self.cumulative_weights()
+        index = np.searchsorted(items, x, side='right')
+        return np.where(index > 0, cumulative[np.maximum(index - 1, 0)], 0.0) / self.n
+
+    # Bound on |estimated CDF - true CDF| at any one point, holding with about 99% probability
+    def error_bound(self):
+        return SKETCH_Z * np.sqrt(self.variance) / self.n if self.n else 0.0
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, k=self.k, n=self.n, variance=self.variance,
+                            **{f'level_{level}': items for level, items in enumerate(self.levels)})
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        stored = np.load(io.BytesIO(data), allow_pickle=False)
+        sketch = cls(k=int(stored['k']))
+        sketch.n = int(stored['n'])
+        sketch.variance = float(stored['variance'])
+        num_levels = sum(1 for name in stored.files if name.startswith('level_'))
+        sketch.levels = [stored[f'level_{level}'] for level in range(num_levels)]
+        return sketch
+
+# Function to sketch one column of a file in a single chunked pass
+def sketch_column(file, file_name, column, k=SKETCH_K):
+    sketch = KLLSketch(k)
+    for values in read_column_chunks(file, file_name, column):
+        sketch.update(values)
+    return sketch
+
+# Function to estimate the two-sample KS statistic from two sketches, with its error bound;
+# both are NaN when either sketch is empty
+def ks_from_sketches(sketch_1, sketch_2):
+    if sketch_1.n == 0 or sketch_2.n == 0:
+        return np.nan, np.nan
+    values = np.concatenate([sketch_1.cumulative_weights()[0], sketch_2.cumulative_weights()[0]])
+    statistic = np.abs(sketch_1.cdf(values) - sketch_2.cdf(values)).max()
+    return statistic, sketch_1.error_bound() + sketch_2.error_bound()
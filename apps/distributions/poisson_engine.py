@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import minimize_scalar
+from scipy.special import gammaln, xlogy
+from scipy.stats import nbinom, norm, poisson
+
+# Rows of the count column read from a file at a time
+CHUNK_ROWS = 1_000_000
+
+# Largest count accepted, which bounds the size of the frequency table
+MAX_COUNT = 10_000_000
+
+# Bootstrap replicates per independent RNG stream; the unit of work handed to a process
+BOOTSTRAP_BLOCK = 1000
+
+# Table cells resampled at once, which bounds the memory of a batch of multinomial draws
+RESAMPLE_CELLS = 2 ** 22
+
+# Function to check that values are non-negative whole numbers and tally them into a
+# frequency table, where table[k] is the number of times k was observed
+def count_table(values):
+    values = np.asarray(values, dtype=np.float64)
+    bad = ~((values >= 0) & (values == np.floor(values)))
+    if bad.any():
+        raise ValueError(f"Counts must be non-negative whole numbers; found {values[bad][0]:g}.")
+    if len(values) and values.max() > MAX_COUNT:
+        raise ValueError(f"Counts above {MAX_COUNT:,} are not supported; found {values.max():g}.")
+    return np.bincount(values.astype(np.int64))
+
+# Function to add two frequency tables of possibly different lengths
+def add_tables(table_1, table_2):
+    if len(table_1) < len(table_2):
+        table_1, table_2 = table_2, table_1
+    table = table_1.copy()
+    table[:len(table_2)] += table_2
+    return table
+
+# Function to stream the first column of a CSV or Excel file into a frequency table, chunk by
+# chunk, so memory grows with the largest count rather than with the number of rows. Empty
+# cells are skipped; anything else that is not a non-negative whole number is an error.
+def read_count_table(file, file_name, chunk_rows=CHUNK_ROWS):
+    if file_name.endswith('.xlsx'):
+        # Excel cannot be read in chunks, but only the first column is loaded
+        chunks = [pd.read_excel(file, usecols=[0])]
+    else:
+        chunks = pd.read_csv(file, usecols=[0], chunksize=chunk_rows)
+    table = np.zeros(0, dtype=np.int64)
+    for chunk in chunks:
+        column = chunk.iloc[:, 0].dropna()
+        values = pd.to_numeric(column, errors='coerce')
+        if values.isna().any():
+            raise ValueError(f"Counts must be numbers; found {column[values.isna()].iloc[0]!r}.")
+        table = add_tables(table, count_table(values.to_numpy()))
+    return table
+
+# Function to reduce a frequency table, once, to the statistics every model's log-likelihood
+# needs: the sample size, the total count, the sum of log k! and the number of zeros. The
+# negative binomial also uses the table itself.
+def sufficient_statistics(table):
+    counts = np.arange(len(table))
+    return {
+        'n': int(table.sum()),
+        'total': float(table @ counts),
+        'log_factorial': float(table @ gammaln(counts + 1)),
+        'zeros': int(table[0]) if len(table) else 0,
+        'table': table,
+    }
+
+# Poisson log-likelihood over a whole grid of λ values: Σk·log λ - nλ - Σlog k!
+def poisson_log_likelihood(stats, lam, shape=None):
+    lam = np.asarray(lam, dtype=np.float64)
+    return xlogy(stats['total'], lam) - stats['n'] * lam - stats['log_factorial']
+
+# Zero-inflated Poisson log-likelihood, where shape is the probability π of an extra zero:
+# each zero contributes log(π + (1-π)e^-λ) and each positive count log(1-π) plus its Poisson term
+def zip_log_likelihood(stats, lam, shape):
+    lam = np.asarray(lam, dtype=np.float64)
+    positives = stats['n'] - stats['zeros']
+    return (stats['zeros'] * np.log(shape + (1 - shape) * np.exp(-lam))
+            + positives * (np.log1p(-shape) - lam)
+            + xlogy(stats['total'], lam) - stats['log_factorial'])
+
+# Negative binomial log-likelihood with mean λ and size shape (r). The Σlog Γ(k + r) term does
+# not depend on λ, so it is one sum over the frequency table for the whole grid.
+def negative_binomial_log_likelihood(stats, lam, shape):
+    lam = np.asarray(lam, dtype=np.float64)
+    table = stats['table']
+    gamma_terms = table @ gammaln(np.arange(len(table)) + shape) - stats['n'] * gammaln(shape)
+    return (gamma_terms - stats['log_factorial']
+            + xlogy(stats['total'], lam / (shape + lam))
+            + stats['n'] * shape * np.log(shape / (shape + lam)))
+
+# Probability mass functions of the fitted models at counts k
+def poisson_model_pmf(k, lam, shape=None):
+    return poisson.pmf(k, lam)
+
+def zip_pmf(k, lam, shape):
+    return shape * (k == 0) + (1 - shape) * poisson.pmf(k, lam)
+
+def negative_binomial_pmf(k, lam, shape):
+    return nbinom.pmf(k, shape, shape / (shape + lam))
+
+# Count models: their log-likelihood over a λ grid, their pmf, and the slider for their extra
+# shape parameter as (label, min, max, default), or None for the plain Poisson
+MODELS = {
+    'Poisson': dict(log_likelihood=poisson_log_likelihood, pmf=poisson_model_pmf, shape=None),
+    'Zero-inflated Poisson': dict(log_likelihood=zip_log_likelihood, pmf=zip_pmf,
+                                  shape=('Zero inflation (π)', 0.0, 0.95, 0.2)),
+    'Negative binomial': dict(log_likelihood=negative_binomial_log_likelihood, pmf=negative_binomial_pmf,
+                              shape=('Size (r)', 0.5, 50.0, 5.0)),
+}
+
+# Function to find the MLE of λ with the model's shape parameter held fixed. For the Poisson and
+# the negative binomial it is the sample mean; the zero-inflated Poisson is maximised numerically,
+# knowing its MLE lies below the mean of the positive counts.
+def fit_lambda(stats, model, shape=None):
+    mean = stats['total'] / stats['n']
+    if model != 'Zero-inflated Poisson' or mean == 0:
+        return mean
+    upper = stats['total'] / (stats['n'] - stats['zeros'])
+    result = minimize_scalar(lambda lam: -zip_log_likelihood(stats, lam, shape), bounds=(1e-9, upper), method='bounded')
+    return result.x
+
+# Function to draw bootstrap estimates of λ from a frequency table. A nonparametric resample of
+# the n rows is one multinomial draw over the table; a parametric resample from Poisson(λ̂) only
+# enters the estimate through its total, which is Poisson(nλ̂).
+def bootstrap_block(seed_seq, table, num_replicates, parametric):
+    rng = np.random.default_rng(seed_seq)
+    n = int(table.sum())
+    counts = np.arange(len(table))
+    if parametric:
+        return rng.poisson(table @ counts, size=num_replicates) / n
+
+    estimates = []
+    batch = max(RESAMPLE_CELLS // len(table), 1)
+    for start in range(0, num_replicates, batch):
+        resampled = rng.multinomial(n, table / n, size=min(batch, num_replicates - start))
+        estimates.append(resampled @ counts / n)
+    return np.concatenate(estimates)
+
+# Function to draw num_replicates nonparametric and parametric bootstrap estimates of λ,
+# optionally over several processes. Every block of BOOTSTRAP_BLOCK replicates has its own RNG
+# stream spawned from the seed, so the result only depends on the seed and not on the number
+# of processes.
+def bootstrap_estimates(table, num_replicates, seed, num_workers=1):
+    sizes = [min(BOOTSTRAP_BLOCK, num_replicates - start) for start in range(0, num_replicates, BOOTSTRAP_BLOCK)]
+    seeds = np.random.SeedSequence(seed).spawn(2 * len(sizes))
+    blocks = (seeds, [table] * (2 * len(sizes)), sizes * 2, [False] * len(sizes) + [True] * len(sizes))
+
+    if num_workers > 1 and len(seeds) > 1:
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(seeds))) as pool:
+            results = list(pool.map(bootstrap_block, *blocks))
+    else:
+        results = list(map(bootstrap_block, *blocks))
+
+    return np.concatenate(results[:len(sizes)]), np.concatenate(results[len(sizes):])
+
+# Function to compute the Wald, bootstrap percentile and parametric bootstrap intervals for λ
+def confidence_intervals(table, confidence, num_replicates, seed, num_workers=1):
+    n = table.sum()
+    lambda_estimate = (table @ np.arange(len(table))) / n
+    margin = norm.ppf(1 - (1 - confidence) / 2) * np.sqrt(lambda_estimate / n)
+    bootstrap, parametric = bootstrap_estimates(table, num_replicates, seed, num_workers)
+    tails = [100 * (1 - confidence) / 2, 100 * (1 + confidence) / 2]
+    return pd.DataFrame({
+        'Method': ['Wald', 'Bootstrap percentile', 'Parametric bootstrap'],
+        'Lower': [lambda_estimate - margin, *np.percentile([bootstrap, parametric], tails[0], axis=1)],
+        'Upper': [lambda_estimate + margin, *np.percentile([bootstrap, parametric], tails[1], axis=1)],
+    })
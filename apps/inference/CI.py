@@ -1,7 +1,12 @@
 import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
-from scipy.stats import norm
+import os
+import sys
+# The shared distribution cache lives in apps/, one level above this app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from distribution_cache import critical_value
+from ci_engine import POPULATIONS, coverage_study, exact_normal_statistics, simulated_statistics
 
 st.set_page_config(page_title="Confidence Interval Visualization", layout="wide")
 
@@ -19,20 +24,30 @@ with st.sidebar:
     num_columns = st.number_input('Number of Samples', min_value=1, value=100)
     num_observations = st.number_input('Number of Observations', min_value=1, value=10000)
     confidence_level = st.slider('Confidence Level', min_value=0.0, max_value=1.0, value=0.90)
+    sampling = st.radio('Sampling', ['Exact (normal population)', 'Simulate observations'],
+                        help='Exact sampling draws each sample mean and standard deviation from its exact distribution, '
+                             'so the cost does not depend on the number of observations. '
+                             'Simulating draws every observation, in chunks, and works for any population.')
+    if sampling == 'Simulate observations':
+        population = st.selectbox('Population', list(POPULATIONS))
     #st.text("Created by Dr. Jishan Ahmed")
 
-# Generate the data
-np.random.seed(42)
-data = np.random.randn(num_observations, num_columns)
+# Function to simulate every observation of the samples, cached since the cost grows with the matrix size
+@st.cache_data(show_spinner='Simulating observations...')
+def cached_simulated_statistics(population, num_columns, num_observations):
+    return simulated_statistics(np.random.default_rng(42), population, num_columns, num_observations)
 
-# Compute the mean for each variable
-means = np.mean(data, axis=0)
+# Generate the sample means and standard deviations
+if sampling == 'Exact (normal population)':
+    means, stds = exact_normal_statistics(np.random.default_rng(42), num_columns, num_observations)
+else:
+    means, stds = cached_simulated_statistics(population, num_columns, num_observations)
 
 # Compute the standard error of the mean (SEM)
-stderr = np.std(data, axis=0, ddof=1) / np.sqrt(num_observations)
+stderr = stds / np.sqrt(num_observations)
 
 # Calculate the z-scores for the confidence interval
-z_score = norm.ppf(1 - (1 - confidence_level) / 2)
+z_score = critical_value((1 - confidence_level) / 2)
 
 # Calculate the margins of error for each mean
 margins_of_error = z_score * stderr
@@ -93,6 +108,65 @@ fig.update_layout(
 # Display the figure in the Streamlit app
 st.plotly_chart(fig, use_container_width=True)
 
+# Function to run the coverage study for a grid, cached so revisiting a grid is instant
+@st.cache_data(show_spinner='Running coverage study...')
+def cached_coverage_study(populations, sample_sizes, levels, num_intervals, seed, num_workers):
+    z_values = [critical_value((1 - level) / 2) for level in levels]
+    t_values = [[critical_value((1 - level) / 2, n - 1) for level in levels] for n in sample_sizes]
+    return coverage_study(populations, sample_sizes, levels, num_intervals, seed, z_values, t_values, num_workers)
+
+# Function to draw one coverage heatmap per interval type: each row is a population and
+# confidence level, each column a sample size, colored by how far coverage falls from nominal
+def coverage_heatmap(results, interval):
+    subset = results[results['Interval'] == interval]
+    coverage = subset.pivot_table(index=['Population', 'Confidence level'], columns='Sample size', values='Coverage')
+    nominal = coverage.index.get_level_values('Confidence level').to_numpy()[:, None]
+    fig = go.Figure(go.Heatmap(
+        z=coverage.to_numpy() - nominal,
+        x=[str(n) for n in coverage.columns],
+        y=[f'{population}, {level:.0%}' for population, level in coverage.index],
+        text=coverage.to_numpy(),
+        texttemplate='%{text:.3f}',
+        colorscale='RdBu',
+        zmid=0,
+        colorbar=dict(title='Coverage − nominal')
+    ))
+    fig.update_layout(
+        title=f'Empirical Coverage of {interval}-Intervals',
+        xaxis_title='Sample Size',
+        template="plotly_white",
+        height=max(400, 30 * len(coverage))
+    )
+    return fig
+
+# Coverage study across confidence levels, sample sizes and populations
+st.header("Coverage Study")
+st.markdown("""
+    How often do z- and t-intervals actually contain the true mean? Each cell simulates many
+    intervals and reports the fraction that cover it, next to the nominal confidence level.
+""")
+col1, col2, col3 = st.columns(3)
+study_levels = col1.multiselect('Confidence Levels', [0.80, 0.90, 0.95, 0.99], default=[0.80, 0.90, 0.95, 0.99],
+                                format_func=lambda level: f'{level:.0%}')
+study_sizes = col2.multiselect('Sample Sizes', [2, 5, 10, 20, 30, 50, 100, 200], default=[5, 10, 30, 100])
+study_populations = col3.multiselect('Populations', list(POPULATIONS), default=list(POPULATIONS))
+col1, col2, col3 = st.columns(3)
+num_intervals = col1.number_input('Intervals per Cell', min_value=1000, max_value=200000, value=20000, step=1000)
+study_seed = col2.number_input('Random Seed', min_value=0, value=42)
+num_workers = col3.number_input('Worker Processes', min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1)
+
+if st.button('Run Coverage Study') and study_levels and study_sizes and study_populations:
+    st.session_state['ci_coverage'] = cached_coverage_study(
+        tuple(study_populations), tuple(sorted(study_sizes)), tuple(sorted(study_levels)),
+        int(num_intervals), int(study_seed), int(num_workers))
+
+# Keep the last study on screen while the rest of the app is used
+if 'ci_coverage' in st.session_state:
+    results = st.session_state['ci_coverage']
+    col1, col2 = st.columns(2)
+    col1.plotly_chart(coverage_heatmap(results, 'z'), use_container_width=True)
+    col2.plotly_chart(coverage_heatmap(results, 't'), use_container_width=True)
+
 # Signature at the bottom
 st.markdown("---")
 st.markdown("Created by Dr. Jishan Ahmed")
@@ -1,10 +1,17 @@
+import io
 import streamlit as st
 import pandas as pd
 import numpy as np
 from scipy import stats
 import matplotlib.pyplot as plt
 import seaborn as sns
-import statsmodels.api as sm
+from statsmodels.stats.multitest import multipletests
+import os
+import sys
+# The shared helpers live in apps/, one level above this app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from distribution_cache import critical_value, distribution_grid
+from column_profiler import file_digest, profile_file
 # Function to load data
 def load_data(uploaded_file):
     if uploaded_file.name.endswith('.csv'):
@@ -13,27 +20,79 @@ def load_data(uploaded_file):
         df = pd.read_excel(uploaded_file)
     return df
 
-# Function to display summary statistics
-def display_summary(df):
-    summary_df = df.describe().transpose()
-    missing = df.isna().sum()
-    missing_percent = (missing / len(df)) * 100
-    summary_df['Missing (%)'] = missing_percent
+# Function to profile every column of an uploaded file in one chunked pass, once per file contents
+@st.cache_data(show_spinner='Profiling columns...')
+def load_profile(digest, _file_bytes, file_name):
+    return profile_file(io.BytesIO(_file_bytes), file_name)
+
+# Function to display summary statistics of the numeric columns, laid out like df.describe()
+def display_summary(profile):
+    numeric = profile[profile['Dtype'].map(pd.api.types.is_numeric_dtype)]
+    summary_df = numeric[['Count', 'Mean', 'Std', 'Min', '25%', '50%', '75%', 'Max']].astype(float)
+    summary_df.columns = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+    summary_df['Missing (%)'] = numeric['Missing %']
     return summary_df
 
+# Order statistics drawn at most in the Q-Q plot
+QQ_POINTS = 2000
+
+# Outliers drawn at most in the box plot
+BOX_OUTLIERS = 500
+
+# Function to choose the order statistics (1-based ranks) to draw in the Q-Q plot: every one for
+# small samples, otherwise QQ_POINTS ranks evenly spaced in normal scores, which keeps the tails dense
+def qq_ranks(n, num_points=QQ_POINTS):
+    if n <= num_points:
+        return np.arange(1, n + 1)
+    scores = np.linspace(stats.norm.ppf(1 / (n + 1)), stats.norm.ppf(n / (n + 1)), num_points)
+    return np.unique(np.clip(np.rint(stats.norm.cdf(scores) * (n + 1)), 1, n).astype(int))
+
+# Function to compute the Q-Q points and the box plot statistics of a sample from a single sort,
+# which numpy does faster than partitioning around the thousands of ranks the Q-Q plot needs
+def quantile_summary(sample_data, column):
+    x = np.sort(np.asarray(sample_data, dtype=float))
+    n = len(x)
+    ranks = qq_ranks(n)
+    quartile_positions = (n - 1) * np.array([0.25, 0.5, 0.75])
+    below, above = np.floor(quartile_positions).astype(int), np.ceil(quartile_positions).astype(int)
+
+    # Quartiles interpolated between order statistics, as np.quantile does
+    q1, median, q3 = x[below] + (quartile_positions - below) * (x[above] - x[below])
+    low_fence, high_fence = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    # The data is sorted, so the whisker ends and the outliers are found by binary search
+    first = np.searchsorted(x, low_fence, side='left')
+    last = np.searchsorted(x, high_fence, side='right')
+    outliers = np.r_[x[:first], x[last:]]
+    if len(outliers) > BOX_OUTLIERS:
+        # Keep the most extreme outliers, once each, and a random subsample of the rest
+        rng = np.random.default_rng(0)
+        outliers = np.r_[outliers[0], outliers[-1], rng.choice(outliers[1:-1], BOX_OUTLIERS - 2, replace=False)]
+
+    box_stats = dict(label=column, med=median, q1=q1, q3=q3, whislo=x[first], whishi=x[last - 1], fliers=outliers)
+    # Q-Q points standardized by the fitted normal, as sm.qqplot(fit=True) draws them
+    theoretical = stats.norm.ppf(ranks / (n + 1))
+    sample_quantiles = (x[ranks - 1] - x.mean()) / x.std()
+    return theoretical, sample_quantiles, box_stats
+
 # Function to create a Q-Q plot and a box plot side by side
 def qq_and_box_plot(df, column):
     sample_data = df[column].dropna()
+    theoretical, sample_quantiles, box_stats = quantile_summary(sample_data, column)
 
     # Create a matplotlib figure and axes for two subplots
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
 
     # Generate Q-Q plot on the first subplot
-    sm.qqplot(sample_data, color='darkorange', line='45', ax=ax1, fit=True)
+    ax1.plot(theoretical, sample_quantiles, 'o', color='darkorange', markersize=4)
+    ax1.axline((0, 0), slope=1, color='red')
+    ax1.set_xlabel('Theoretical Quantiles')
+    ax1.set_ylabel('Sample Quantiles')
     ax1.set_title('Q-Q plot to Check Normality Assumption')
 
     # Generate Box plot on the second subplot
-    sns.boxplot(y=sample_data,color='crimson', ax=ax2)
+    ax2.bxp([box_stats], patch_artist=True, widths=0.5, boxprops=dict(facecolor='crimson'),
+            medianprops=dict(color='black'), flierprops=dict(marker='d', markerfacecolor='gray'))
+    ax2.set_ylabel(column)
     ax2.set_title(f'Box Plot of {column}')
 
     # Show the plots in Streamlit
@@ -49,7 +108,8 @@ def one_sample_t_test_plot(df, column, popmean, alpha):
     t_statistic = (sample_mean - popmean) / standard_error
     df = sample_size - 1
     p_value = 2 * stats.t.sf(np.abs(t_statistic), df)
-    ci = stats.t.interval(1-alpha, df, loc=sample_mean, scale=standard_error)
+    crit_t = critical_value(alpha/2, df)
+    ci = (sample_mean - crit_t * standard_error, sample_mean + crit_t * standard_error)
     
     # Plotting
     sns.set(style="whitegrid")
@@ -59,11 +119,11 @@ def one_sample_t_test_plot(df, column, popmean, alpha):
     ax[0].set_title(f'Distribution of {column}')
     ax[0].text(sample_mean+0.5, ax[0].get_ylim()[1]*0.9, f'Mean: {sample_mean:.2f}\nSD: {sample_std:.2f}', color='red')
 
-    x = np.linspace(stats.t.ppf(0.001, df), stats.t.ppf(0.999, df), 100)
-    ax[1].plot(x, stats.t.pdf(x, df), 'b-', lw=2, alpha=0.6, label='t-distribution')
+    x, pdf, _ = distribution_grid('t', (df,), num_points=100)
+    ax[1].plot(x, pdf, 'b-', lw=2, alpha=0.6, label='t-distribution')
     ax[1].axvline(x=t_statistic, color='green', linestyle='--', label=f'T-statistic = {t_statistic:.2f}')
-    ax[1].fill_between(x, 0, stats.t.pdf(x, df), where=(x >= stats.t.ppf(1-alpha/2, df)), color='red', alpha=0.5, label='Rejection region')
-    ax[1].fill_between(x, 0, stats.t.pdf(x, df), where=(x <= stats.t.ppf(alpha/2, df)), color='red', alpha=0.5)
+    ax[1].fill_between(x, 0, pdf, where=(x >= crit_t), color='red', alpha=0.5, label='Rejection region')
+    ax[1].fill_between(x, 0, pdf, where=(x <= -crit_t), color='red', alpha=0.5)
     
     ax[1].annotate(f'$H_0: \mu={popmean}$', xy=(0.05, 0.95), xycoords='axes fraction', fontsize=12)
     ax[1].annotate(f'$H_a: \mu\\neq{popmean}$', xy=(0.05, 0.90), xycoords='axes fraction', fontsize=12)
@@ -83,6 +143,39 @@ def one_sample_t_test_plot(df, column, popmean, alpha):
     })
     return decision, decision_color, result_df
 
+# Function to run a one-sample t-test on every numeric column at once, from the counts, means
+# and standard deviations in the column profile, with Benjamini-Hochberg and Holm adjusted p-values.
+# Columns with no spread have no t-statistic; they are marked not testable and left out of both corrections.
+def batch_t_tests(profile, popmean, alpha):
+    numeric = profile[profile['Dtype'].map(pd.api.types.is_numeric_dtype) & (profile['Count'] > 1)]
+    sample_size = numeric['Count'].to_numpy(dtype=float)
+    sample_mean = numeric['Mean'].to_numpy(dtype=float)
+    standard_error = numeric['Std'].to_numpy(dtype=float) / np.sqrt(sample_size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_statistic = (sample_mean - popmean) / standard_error
+    df = sample_size - 1
+    p_value = 2 * stats.t.sf(np.abs(t_statistic), df)
+    testable = (standard_error > 0) & np.isfinite(p_value)
+    t_statistic[~testable] = p_value[~testable] = np.nan
+    crit_t = stats.t.isf(alpha/2, df)
+
+    results = pd.DataFrame({
+        'n': sample_size.astype(int),
+        'Mean': sample_mean,
+        'T-statistic': t_statistic,
+        'P-value': p_value,
+        'CI Lower': sample_mean - crit_t * standard_error,
+        'CI Upper': sample_mean + crit_t * standard_error,
+        'Testable': testable,
+    }, index=numeric.index)
+    results['BH Adjusted P-value'] = results['Holm Adjusted P-value'] = np.nan
+    if testable.any():
+        results.loc[testable, 'BH Adjusted P-value'] = multipletests(p_value[testable], alpha=alpha, method='fdr_bh')[1]
+        results.loc[testable, 'Holm Adjusted P-value'] = multipletests(p_value[testable], alpha=alpha, method='holm')[1]
+    results['Reject (BH)'] = results['BH Adjusted P-value'] < alpha
+    results['Reject (Holm)'] = results['Holm Adjusted P-value'] < alpha
+    return results
+
 # Set Streamlit layout
 st.set_page_config(layout="wide")
 
@@ -93,18 +186,21 @@ with st.sidebar:
     uploaded_file = st.file_uploader("Upload your CSV or Excel file", type=["csv", "xlsx"])
     if uploaded_file is not None:
         df = load_data(uploaded_file)
-        test_type = st.selectbox('Select Test Type', ['One-sample t-test'])
+        test_type = st.selectbox('Select Test Type', ['One-sample t-test', 'Batch one-sample t-tests'])
         column = st.selectbox('Select Column', df.columns)
         popmean = st.number_input('Population Mean (μ0)', value=0.0)
         alpha = st.slider('Significance Level (α)', 0.01, 0.10, 0.05)
-        test_button = st.button('Perform One-sample t-test')
+        test_button = st.button(f'Perform {test_type}')
 
 # Main Area
 if uploaded_file is not None:
     st.markdown("<h2 style='color:blue;'>Data Preview</h2>", unsafe_allow_html=True)
     st.dataframe(df.head())
     st.markdown("<h2 style='color:blue;'>Summary Statistics</h2>", unsafe_allow_html=True)
-    summary_df = display_summary(df)
+    file_bytes = uploaded_file.getvalue()
+    digest = file_digest(file_bytes)
+    profile = load_profile(digest, file_bytes, uploaded_file.name)
+    summary_df = display_summary(profile)
     st.dataframe(summary_df)
     st.markdown("<h2 style='color:blue;'>Exploratory Data Analysis</h2>", unsafe_allow_html=True)
     qq_and_box_plot(df, column) # Displaying the Q-Q plot
@@ -117,3 +213,23 @@ if uploaded_file is not None:
         #st.write("### Test Results")
         st.dataframe(result_df)
         st.markdown(f"<h4 style='color:{decision_color};'>{decision}</h4>", unsafe_allow_html=True)
+
+    if test_type == 'Batch one-sample t-tests':
+        # Keep the batch results for this file on screen while columns are picked for plotting
+        if test_button:
+            st.session_state['batch_t_tests'] = digest
+        if st.session_state.get('batch_t_tests') == digest:
+            st.markdown("<h2 style='color:orangered;'>Hypothesis Testing</h2>", unsafe_allow_html=True)
+            batch_results = batch_t_tests(profile, popmean, alpha)
+            st.write(f"{batch_results['Reject (BH)'].sum()} of {batch_results['Testable'].sum()} testable columns differ from μ0 = {popmean} "
+                     f"with the false discovery rate controlled at {alpha} (Benjamini-Hochberg), "
+                     f"and {batch_results['Reject (Holm)'].sum()} with the family-wise error rate controlled (Holm).")
+            untestable = batch_results.index[~batch_results['Testable']]
+            if len(untestable):
+                st.caption(f"Not testable, because every value is the same: {', '.join(map(str, untestable))}.")
+            st.dataframe(batch_results, use_container_width=True)
+
+            plot_columns = st.multiselect('Select columns to plot', batch_results.index)
+            for plot_column in plot_columns:
+                st.markdown(f"<h3 style='color:magenta;'>{plot_column}</h3>", unsafe_allow_html=True)
+                one_sample_t_test_plot(df, plot_column, popmean, alpha)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# Simulated observations held in memory at once when samples are drawn value by value
+CHUNK_VALUES = 2 ** 22
+
+# Populations to sample from, each with mean 0 so every interval should cover 0
+POPULATIONS = {
+    'Normal': lambda rng, size: rng.standard_normal(size),
+    'Skewed (exponential)': lambda rng, size: rng.exponential(1.0, size) - 1.0,
+    'Heavy-tailed (t, 3 df)': lambda rng, size: rng.standard_t(3, size),
+}
+
+# Function to draw the means and standard deviations of num_samples standard normal samples of
+# size n straight from their exact distributions: the mean is N(0, 1/n), and (n - 1)s² is
+# chi-square with n - 1 degrees of freedom, independent of the mean. The cost does not depend on n.
+def exact_normal_statistics(rng, num_samples, n):
+    means = rng.normal(0.0, 1.0 / np.sqrt(n), num_samples)
+    if n < 2:
+        return means, np.full(num_samples, np.nan)
+    return means, np.sqrt(rng.chisquare(n - 1, num_samples) / (n - 1))
+
+# Function to draw num_samples samples of size n from a population and return their means and
+# standard deviations. The n x num_samples matrix is drawn a block of rows at a time, and each
+# block's column means and sums of squared deviations are merged into the running totals.
+def simulated_statistics(rng, population, num_samples, n, chunk_values=CHUNK_VALUES):
+    draw = POPULATIONS[population]
+    chunk_rows = max(chunk_values // num_samples, 1)
+    count = 0
+    means = np.zeros(num_samples)
+    m2 = np.zeros(num_samples)
+
+    for start in range(0, n, chunk_rows):
+        block = draw(rng, (min(chunk_rows, n - start), num_samples))
+        block_count = len(block)
+        block_means = block.mean(axis=0)
+        block_m2 = ((block - block_means) ** 2).sum(axis=0)
+
+        # Chan's pairwise update of the mean and the sum of squared deviations
+        total = count + block_count
+        delta = block_means - means
+        means = means + delta * block_count / total
+        m2 = m2 + block_m2 + delta ** 2 * count * block_count / total
+        count = total
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return means, np.sqrt(m2 / (n - 1))
+
+# Function to estimate, for one population and sample size, how often z and t intervals at each
+# confidence level cover the true mean, from num_intervals simulated samples. The samples are
+# shared by every level and interval type, so their coverages are directly comparable.
+def cell_coverage(seed_seq, population, n, num_intervals, z_values, t_values):
+    rng = np.random.default_rng(seed_seq)
+    if population == 'Normal':
+        means, stds = exact_normal_statistics(rng, num_intervals, n)
+    else:
+        means, stds = simulated_statistics(rng, population, num_intervals, n)
+    # An interval covers 0 when |mean| / SEM is at most its critical value
+    ratios = np.sort(np.abs(means) / (stds / np.sqrt(n)))
+    z_coverage = np.searchsorted(ratios, z_values, side='right') / num_intervals
+    t_coverage = np.searchsorted(ratios, t_values, side='right') / num_intervals
+    return z_coverage, t_coverage
+
+# Function to run the coverage study over every population and sample size, optionally over
+# several processes. z_values holds the z critical value of each confidence level, and
+# t_values[i] the t critical values for sample_sizes[i]. Each cell's RNG stream comes from the
+# seed, the population and the sample size, so a cell gives the same result in any grid.
+# Returns a DataFrame with one row per cell, confidence level and interval type.
+def coverage_study(populations, sample_sizes, levels, num_intervals, seed, z_values, t_values, num_workers=1):
+    cells = [(population, n, t) for population in populations for n, t in zip(sample_sizes, t_values)]
+    seeds = [np.random.SeedSequence([seed, list(POPULATIONS).index(population), n]) for population, n, _ in cells]
+    columns = (seeds, [population for population, _, _ in cells], [n for _, n, _ in cells],
+               [num_intervals] * len(cells), [z_values] * len(cells), [t for _, _, t in cells])
+
+    if num_workers > 1 and len(cells) > 1:
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(cells))) as pool:
+            results = list(pool.map(cell_coverage, *columns))
+    else:
+        results = list(map(cell_coverage, *columns))
+
+    rows = []
+    for (population, n, _), (z_coverage, t_coverage) in zip(cells, results):
+        for interval, coverage in [('z', z_coverage), ('t', t_coverage)]:
+            rows.extend((population, n, level, interval, value) for level, value in zip(levels, coverage))
+    return pd.DataFrame(rows, columns=['Population', 'Sample size', 'Confidence level', 'Interval', 'Coverage'])
@@ -2,6 +2,11 @@ import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import t
+import os
+import sys
+# The shared distribution cache lives in apps/, one level above this app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from distribution_cache import critical_value, distribution_grid
 
 # Function to perform T-test and plot
 def perform_t_test(sample_mean, sample_size, alpha):
@@ -14,11 +19,10 @@ def perform_t_test(sample_mean, sample_size, alpha):
     p_value = t.sf(np.abs(t_statistic), df) * 2  # two-tailed test
 
     fig, ax = plt.subplots()
-    x = np.linspace(t.ppf(0.001, df), t.ppf(0.999, df), 100)
-    y = t.pdf(x, df)
+    x, y, _ = distribution_grid('t', (df,), num_points=100)
     ax.plot(x, y, label='T-distribution')
     
-    crit_t = t.ppf(1 - alpha/2, df)
+    crit_t = critical_value(alpha/2, df)
     ax.fill_between(x, y, where=(x >= crit_t) | (x <= -crit_t), color='red', alpha=0.5, label='Rejection region')
     ax.axvline(t_statistic, color='green', linestyle='dashed', label=f'T-statistic = {t_statistic:.2f}')
     
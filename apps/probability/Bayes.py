@@ -1,8 +1,10 @@
 # bayes_app.py
+import io
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
+import plotly.graph_objects as go
 
 # Configure page
 st.set_page_config(
@@ -66,37 +68,112 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def main():
-    # Header with gradient
-    st.markdown("""
-    <div class="header">
-        <h1 style="margin:0;text-align:center">🏭 Bayesian Machine Failure Analyzer</h1>
-        <p style="text-align:center;margin:0.5rem 0">Visualizing Conditional Probability in Industrial Systems</p>
-    </div>
-    """, unsafe_allow_html=True)
+# Slider ranges in percent as (min, max, step), shared by the controls and the sensitivity surface
+PARAMETER_RANGES = {
+    "Failure Rate": (1.0, 50.0, 0.5),
+    "Detection Rate": (50.0, 100.0, 0.5),
+    "False Alarm Rate": (1.0, 50.0, 0.5),
+}
 
-    # Sidebar controls
-    with st.sidebar:
-        st.markdown("### ⚙️ Control Panel")
-        failure_rate = st.slider(
-            "🚨 Machine Failure Rate (%)",
-            min_value=1.0, max_value=50.0, value=10.0,
-            step=0.5, format="%.1f%%"
-        ) / 100
+# Factory figures (about 125 KB each) and simulations (up to 8 MB each) kept per server before
+# the oldest are evicted
+FIGURE_CACHE_ENTRIES = 64
+SIMULATION_CACHE_ENTRIES = 8
 
-        detection_rate = st.slider(
-            "✅ Test Detection Rate (%)",
-            min_value=50.0, max_value=100.0, value=90.0,
-            step=0.5, format="%.1f%%"
-        ) / 100
+# Function to compute P(F|A) for every combination of slider values in one broadcast expression
+@st.cache_data
+def posterior_grid():
+    axes = [np.linspace(lo, hi, int(round((hi - lo) / step)) + 1) / 100 for lo, hi, step in PARAMETER_RANGES.values()]
+    p_f, p_a_given_f, p_a_given_not_f = np.ix_(*axes)
+    posterior = p_a_given_f * p_f / (p_a_given_f * p_f + p_a_given_not_f * (1 - p_f))
+    return axes, posterior
 
-        false_alarm = st.slider(
-            "⚠️ False Alarm Rate (%)",
-            min_value=1.0, max_value=50.0, value=20.0,
-            step=0.5, format="%.1f%%"
-        ) / 100
+# Function to find the grid index of a slider value (given as a fraction)
+def grid_index(name, value):
+    lo, _, step = PARAMETER_RANGES[name]
+    return int(round((value * 100 - lo) / step))
+
+# Function to draw P(F|A) against two parameters, holding the third at its slider value
+def sensitivity_plot(x_name, y_name, current):
+    axes, posterior = posterior_grid()
+    names = list(PARAMETER_RANGES)
+    x_axis, y_axis = names.index(x_name), names.index(y_name)
+
+    # Slice the precomputed grid at the fixed parameter, then put y on rows and x on columns
+    fixed_name = next(name for name in names if name not in (x_name, y_name))
+    index = [slice(None)] * 3
+    index[names.index(fixed_name)] = grid_index(fixed_name, current[fixed_name])
+    surface = posterior[tuple(index)]
+    if x_axis < y_axis:
+        surface = surface.T
 
-    # Calculate probabilities
+    fig = go.Figure(go.Contour(
+        x=axes[x_axis] * 100,
+        y=axes[y_axis] * 100,
+        z=surface,
+        colorscale="Viridis",
+        contours=dict(start=0, end=1, size=0.05, showlabels=True),
+        colorbar=dict(title="P(F|A)", tickformat=".0%"),
+        hovertemplate=f"{x_name}: %{{x:.1f}}%<br>{y_name}: %{{y:.1f}}%<br>P(F|A): %{{z:.1%}}<extra></extra>"
+    ))
+    fig.add_trace(go.Scatter(
+        x=[current[x_name] * 100],
+        y=[current[y_name] * 100],
+        mode="markers",
+        marker=dict(size=14, color="white", line=dict(color="black", width=2)),
+        name="Current Settings",
+        hoverinfo="skip"
+    ))
+    fig.update_layout(
+        title=f"P(F|A) with {fixed_name} fixed at {current[fixed_name]:.1%}",
+        xaxis_title=f"{x_name} (%)",
+        yaxis_title=f"{y_name} (%)",
+        template="plotly_white",
+        showlegend=False
+    )
+    return fig
+
+# Function to simulate whole factories many times over with binomial draws, returning P(F|A) per replication
+@st.cache_data(max_entries=SIMULATION_CACHE_ENTRIES)
+def simulate_factories(num_machines, num_replications, failure_rate, detection_rate, false_alarm, seed=42):
+    rng = np.random.default_rng(seed)
+
+    # Counts per replication; the cost is O(num_replications) however many machines there are
+    failures = rng.binomial(num_machines, failure_rate, num_replications)
+    true_positives = rng.binomial(failures, detection_rate)
+    false_positives = rng.binomial(num_machines - failures, false_alarm)
+
+    alarms = true_positives + false_positives
+    return np.divide(true_positives, alarms, out=np.zeros(num_replications), where=alarms > 0)
+
+# Function to plot the sampling distribution of the simulated P(F|A) against the exact value
+def simulation_plot(empirical, exact):
+    # Bin on the server so only the bars are sent to the browser
+    density, edges = np.histogram(empirical, bins=60, density=True)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=density,
+        width=np.diff(edges),
+        marker=dict(color="#3498db", line=dict(color="white", width=0.5)),
+        name="Simulated P(F|A)"
+    ))
+    fig.add_vline(x=exact, line=dict(color="#e84118", dash="dash", width=3),
+                  annotation_text=f"Exact: {exact:.2%}", annotation_position="top right")
+    fig.update_layout(
+        title="Sampling Distribution of the Empirical P(F|A)",
+        xaxis_title="P(F|A)",
+        yaxis_title="Density",
+        xaxis_tickformat=".1%",
+        template="plotly_white",
+        showlegend=False
+    )
+    return fig
+
+# Function to draw the factory and test-result bars once per combination of slider values,
+# returning the rendered PNG so a rerun with the same settings skips matplotlib entirely
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES)
+def factory_figure(failure_rate, detection_rate, false_alarm, p_failure_given_positive):
+    # Machine counts in a factory of 1000
     total_machines = 1000
     failures = int(total_machines * failure_rate)
     working = total_machines - failures
@@ -105,8 +182,6 @@ def main():
     false_negatives = failures - true_positives
     false_positives = int(working * false_alarm)
     true_negatives = working - false_positives
-    
-    p_failure_given_positive = true_positives / (true_positives + false_positives) if (true_positives + false_positives) > 0 else 0
 
     # Create visualization
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 9))
@@ -140,10 +215,57 @@ def main():
                 f"{width}\n({width/total_machines:.1%})", 
                 ha='center', va='center', color='white', fontsize=11, weight='bold')
 
+    # Rendered as st.pyplot would, then closed so figures do not pile up across settings
+    image = io.BytesIO()
+    fig.savefig(image, format="png", dpi=200, bbox_inches="tight")
+    plt.close(fig)
+    return image.getvalue()
+
+def main():
+    # Header with gradient
+    st.markdown("""
+    <div class="header">
+        <h1 style="margin:0;text-align:center">🏭 Bayesian Machine Failure Analyzer</h1>
+        <p style="text-align:center;margin:0.5rem 0">Visualizing Conditional Probability in Industrial Systems</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Sidebar controls
+    with st.sidebar:
+        st.markdown("### ⚙️ Control Panel")
+        lo, hi, step = PARAMETER_RANGES["Failure Rate"]
+        failure_rate = st.slider(
+            "🚨 Machine Failure Rate (%)",
+            min_value=lo, max_value=hi, value=10.0,
+            step=step, format="%.1f%%"
+        ) / 100
+
+        lo, hi, step = PARAMETER_RANGES["Detection Rate"]
+        detection_rate = st.slider(
+            "✅ Test Detection Rate (%)",
+            min_value=lo, max_value=hi, value=90.0,
+            step=step, format="%.1f%%"
+        ) / 100
+
+        lo, hi, step = PARAMETER_RANGES["False Alarm Rate"]
+        false_alarm = st.slider(
+            "⚠️ False Alarm Rate (%)",
+            min_value=lo, max_value=hi, value=20.0,
+            step=step, format="%.1f%%"
+        ) / 100
+
+    # P(F|A) read from the precomputed grid, so it matches the sensitivity surface exactly
+    _, posterior = posterior_grid()
+    p_failure_given_positive = float(posterior[
+        grid_index("Failure Rate", failure_rate),
+        grid_index("Detection Rate", detection_rate),
+        grid_index("False Alarm Rate", false_alarm),
+    ])
+
     # Display in plot container
     with st.container():
         st.markdown('<div class="plot-container">', unsafe_allow_html=True)
-        st.pyplot(fig)
+        st.image(factory_figure(failure_rate, detection_rate, false_alarm, p_failure_given_positive), use_column_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
     # Formula breakdown with pre-calculated values
@@ -196,6 +318,45 @@ def main():
         - $P(¬F)$: Healthy machines ({1-failure_rate:.1%})
         """)
 
+    # Sensitivity surface read from the precomputed grid
+    with st.expander("🗺️ Sensitivity Surface", expanded=False):
+        names = list(PARAMETER_RANGES)
+        col1, col2 = st.columns(2)
+        x_name = col1.selectbox("Horizontal axis", names, index=0)
+        y_name = col2.selectbox("Vertical axis", [name for name in names if name != x_name], index=1)
+        current = {
+            "Failure Rate": failure_rate,
+            "Detection Rate": detection_rate,
+            "False Alarm Rate": false_alarm,
+        }
+        st.plotly_chart(sensitivity_plot(x_name, y_name, current), use_container_width=True)
+
+    # Monte Carlo factories, compared with the exact Bayes value
+    with st.expander("🎲 Monte Carlo Factory Simulation", expanded=False):
+        col1, col2 = st.columns(2)
+        num_machines = col1.number_input(
+            "Machines per factory", min_value=100, max_value=1_000_000_000,
+            value=1_000_000, step=100_000
+        )
+        num_replications = col2.number_input(
+            "Replications", min_value=100, max_value=1_000_000,
+            value=10_000, step=1_000
+        )
+        settings = (num_machines, num_replications, failure_rate, detection_rate, false_alarm)
+
+        # Only simulate on request, and keep the result on screen until a setting changes
+        if st.button("Run Simulation"):
+            st.session_state["bayes_simulation"] = settings
+        if st.session_state.get("bayes_simulation") == settings:
+            empirical = simulate_factories(*settings)
+            exact = p_failure_given_positive
+            st.plotly_chart(simulation_plot(empirical, exact), use_container_width=True)
+
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Exact P(F|A)", f"{exact:.3%}")
+            col2.metric("Mean of Simulations", f"{empirical.mean():.3%}", f"{empirical.mean() - exact:+.3%}")
+            col3.metric("Std. Dev. of Simulations", f"{empirical.std(ddof=1):.3%}")
+
     # Developer signature
     st.markdown("""
     <div class="footer">
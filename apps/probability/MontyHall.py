@@ -1,5 +1,5 @@
 import streamlit as st
-import random
+import numpy as np
 import matplotlib.pyplot as plt
 
 # Set page configuration
@@ -9,43 +9,100 @@ st.set_page_config(page_title="Monty Hall Simulator", page_icon="🚪", layout="
 st.title("Monty Hall Problem Simulator 🚗🐐")
 st.markdown("""
 **How it works:**
-1. You pick one of three doors.
-2. The host opens a door, revealing a goat.
+1. You pick one of the doors (three in the classic game).
+2. The host opens one or more of the other doors, revealing goats.
 3. Do you **switch** or **stay** with your choice?
 4. See how your strategy performs over time!
 """)
 
 # Sidebar for user input
 st.sidebar.header("Settings")
-num_simulations = st.sidebar.slider("Number of Simulations", 100, 10000, 1000, 100)
+num_simulations = st.sidebar.slider("Number of Simulations", 100, 10_000_000, 1000, 100)
+num_doors = st.sidebar.slider("Number of Doors", 3, 100, 3)
+# With three doors the host can only open one, and a slider needs a range to choose from
+if num_doors > 3:
+    num_opened = st.sidebar.slider("Doors Opened by Host", 1, num_doors - 2, 1)
+else:
+    num_opened = 1
+    st.sidebar.caption("Doors Opened by Host: 1")
 strategy = st.sidebar.radio("Choose Strategy", ["Switch", "Stay"])
+restart = st.sidebar.button("Restart Simulation")
 
-# Function to simulate the Monty Hall Problem
-def monty_hall_simulation(num_simulations, switch):
-    wins = 0
-    win_rates = []
+# Maximum number of points drawn for the win-rate curve
+max_plot_points = 2000
 
-    for i in range(1, num_simulations + 1):
-        doors = ['goat', 'goat', 'car']
-        random.shuffle(doors)  # Randomly place the car
-        contestant_choice = random.randint(0, 2)
-        remaining_doors = [i for i in range(3) if i != contestant_choice and doors[i] == 'goat']
-        monty_opens = random.choice(remaining_doors)
-        final_choice = [i for i in range(3) if i != contestant_choice and i != monty_opens][0] if switch else contestant_choice
-        wins += doors[final_choice] == 'car'
-        win_rates.append(wins / i)
+# Function to simulate a batch of Monty Hall games with NumPy, scoring both strategies on the same games
+def monty_hall_simulation(num_simulations, num_doors=3, num_opened=1, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    door_dtype = np.min_scalar_type(num_doors)
 
-    return win_rates
+    # One integer per game for the car position and the contestant's pick
+    car = rng.integers(0, num_doors, num_simulations, dtype=door_dtype)
+    contestant_choice = rng.integers(0, num_doors, num_simulations, dtype=door_dtype)
+
+    # The host opens num_opened goat doors other than the pick, leaving
+    # num_doors - 1 - num_opened closed doors to switch to. When the pick is
+    # a goat the car is always among them, and by symmetry the switched-to
+    # door is uniform over them, so it hides the car with probability
+    # 1 / num_closed. Labelling the car's slot 0 turns that into one draw.
+    num_closed = num_doors - 1 - num_opened
+    final_choice = rng.integers(0, num_closed, num_simulations, dtype=door_dtype)
+
+    stay_wins = car == contestant_choice
+    switch_wins = ~stay_wins & (final_choice == 0)
+    return stay_wins, switch_wins
+
+# Theoretical win rate for N doors with k opened by the host
+def theoretical_win_rate(switch, num_doors=3, num_opened=1):
+    if switch:
+        return (num_doors - 1) / (num_doors * (num_doors - 1 - num_opened))
+    return 1 / num_doors
+
+# Function to append a batch of wins to the packed win bits (one bit per game) of num_games games
+def append_wins(packed, num_games, wins):
+    return np.packbits(np.concatenate([np.unpackbits(packed, count=num_games), wins]))
+
+# Function to count the wins up to and including each game in plot_index from the packed win bits
+def wins_at(packed, plot_index):
+    wins = np.unpackbits(packed, count=plot_index[-1] + 1)
+    return np.cumsum(np.add.reduceat(wins, np.r_[0, plot_index[:-1] + 1], dtype=np.int64))
+
+# Function to extend the simulation kept in session state, playing only the games not yet played
+def run_simulation(num_simulations, num_doors, num_opened, restart=False):
+    state = st.session_state.get("monty_hall")
+    if restart or state is None or state["doors"] != (num_doors, num_opened):
+        state = {
+            "doors": (num_doors, num_opened),
+            "rng": np.random.default_rng(),
+            # Wins are kept as packed bits, an eighth of a byte per game
+            "games": 0,
+            "Stay": np.zeros(0, dtype=np.uint8),
+            "Switch": np.zeros(0, dtype=np.uint8),
+        }
+        st.session_state["monty_hall"] = state
+
+    num_new = num_simulations - state["games"]
+    if num_new > 0:
+        stay_wins, switch_wins = monty_hall_simulation(num_new, num_doors, num_opened, state["rng"])
+        state["Stay"] = append_wins(state["Stay"], state["games"], stay_wins)
+        state["Switch"] = append_wins(state["Switch"], state["games"], switch_wins)
+        state["games"] = num_simulations
+
+    return state
 
 # Run simulation
 switch = strategy == "Switch"
-win_rates = monty_hall_simulation(num_simulations, switch)
+state = run_simulation(num_simulations, num_doors, num_opened, restart)
+
+# Only compute and draw a bounded number of points, whatever the number of games
+plot_index = np.unique(np.linspace(0, num_simulations - 1, max_plot_points).astype(int))
+win_rates = wins_at(state[strategy], plot_index) / (plot_index + 1)
 
 # Plot results
 st.subheader(f"Results for **{strategy}** Strategy")
 fig, ax = plt.subplots(figsize=(10, 6))
-ax.plot(range(1, num_simulations + 1), win_rates, label=f"{strategy} Strategy", color="#1f77b4" if switch else "#ff7f0e")
-ax.axhline(y=2/3 if switch else 1/3, color="#1f77b4" if switch else "#ff7f0e", linestyle="--", alpha=0.5, label="Theoretical Win Rate")
+ax.plot(plot_index + 1, win_rates, label=f"{strategy} Strategy", color="#1f77b4" if switch else "#ff7f0e")
+ax.axhline(y=theoretical_win_rate(switch, num_doors, num_opened), color="#1f77b4" if switch else "#ff7f0e", linestyle="--", alpha=0.5, label="Theoretical Win Rate")
 ax.set_xlabel("Number of Simulations")
 ax.set_ylabel("Win Rate")
 ax.set_title(f"Win Rates Over Time ({strategy} Strategy)")
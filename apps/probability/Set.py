@@ -1,61 +1,242 @@
+import io
 import streamlit as st
-from itertools import chain, combinations
+import numpy as np
+import pandas as pd
+from math import comb
 import streamlit.components.v1 as components
 
-def power_set(s):
-    return set(frozenset(combo) for combo in chain.from_iterable(combinations(s, r) for r in range(len(s)+1)))
+# Largest integer a Streamlit number input can hold
+MAX_WIDGET_INT = 2 ** 53 - 1
 
-def format_set_output(s):
-    if all(isinstance(el, frozenset) for el in s):
-        formatted_output = ', '.join(['{' + ', '.join(repr(el) for el in subset) + '}' for subset in s])
+# The power set is never built. Subsets are ordered by size, then lexicographically by
+# element position, and a subset is identified by its rank in that order; it is stored
+# as an integer bitmask whose bit i says whether sorted element i is included.
+
+# Function to count the subsets of an n-element set, optionally only those of size k
+def power_set_size(n, k=None):
+    return 2 ** n if k is None else comb(n, k)
+
+# Function to turn a rank into the bitmask of the subset at that position
+def unrank_subset(n, rank, k=None):
+    if k is None:
+        # Skip over all the smaller subset sizes first
+        k = 0
+        while rank >= comb(n, k):
+            rank -= comb(n, k)
+            k += 1
+    mask = 0
+    for i in range(n):
+        if k == 0:
+            break
+        with_i = comb(n - i - 1, k - 1)
+        if rank < with_i:
+            mask |= 1 << i
+            k -= 1
+        else:
+            rank -= with_i
+    return mask
+
+# Function to turn the bitmask of a subset into its rank
+def rank_subset(n, mask, k=None):
+    size = bin(mask).count("1")
+    rank = 0 if k is not None else sum(comb(n, j) for j in range(size))
+    remaining = size
+    for i in range(n):
+        if remaining == 0:
+            break
+        if mask >> i & 1:
+            remaining -= 1
+        else:
+            rank += comb(n - i - 1, remaining - 1)
+    return rank
+
+# Function to build one page of subsets as element lists, without touching the rest of the power set
+def power_set_page(elements, page, page_size, k=None):
+    n = len(elements)
+    start = page * page_size
+    stop = min(start + page_size, power_set_size(n, k))
+    rows = []
+    for rank in range(start, stop):
+        mask = unrank_subset(n, rank, k)
+        rows.append((rank, [elements[i] for i in range(n) if mask >> i & 1]))
+    return rows
+
+# Function to show the power set of a set a page at a time
+def show_power_set(name, s):
+    elements = sorted(s)
+    n = len(elements)
+
+    col1, col2 = st.columns(2)
+    size_filter = col1.selectbox("Subset size", ["All sizes"] + list(range(n + 1)), key=f"size_{name}")
+    page_size = col2.selectbox("Subsets per page", [10, 25, 50, 100], index=1, key=f"page_size_{name}")
+    k = None if size_filter == "All sizes" else size_filter
+
+    total = power_set_size(n, k)
+    if k is None:
+        st.success(f"The power set of {name} has 2^{n} = {total:,} subsets.")
     else:
-        formatted_output = ', '.join(repr(el) for el in s)
+        st.success(f"{name} has C({n}, {k}) = {total:,} subsets of size {k}.")
+
+    # Jump straight to the page holding a given subset
+    lookup = st.text_input("Find a subset (comma separated)", key=f"lookup_{name}")
+    page = None
+    if lookup:
+        subset = {item.strip() for item in lookup.split(',') if item.strip()}
+        missing = subset - set(elements)
+        if missing:
+            st.error(f"Not in {name}: {format_set_output(missing)}")
+        elif k is not None and len(subset) != k:
+            st.error(f"That subset has {len(subset)} elements, not {k}.")
+        else:
+            mask = sum(1 << i for i, element in enumerate(elements) if element in subset)
+            rank = rank_subset(n, mask, k)
+            page = rank // page_size
+            st.info(f"{format_set_output(subset)} is subset number {rank:,} (page {page + 1:,}).")
+
+    num_pages = -(-total // page_size)
+    page_number = st.number_input("Page", min_value=1, max_value=min(num_pages, MAX_WIDGET_INT),
+                                  value=1 if page is None else min(page + 1, MAX_WIDGET_INT),
+                                  key=f"page_{name}_{k}_{page_size}_{page}")
+    rows = power_set_page(elements, page_number - 1, page_size, k)
+    st.dataframe({
+        "Rank": [f"{rank:,}" for rank, _ in rows],
+        "Size": [len(subset) for _, subset in rows],
+        "Subset": [format_set_output(subset) for _, subset in rows],
+    }, use_container_width=True, hide_index=True)
+    st.caption(f"Page {page_number:,} of {num_pages:,}")
+
+# Function to read the IDs in the first column of an uploaded CSV, text or Excel file. IDs are
+# read as text, so leading zeros are kept and "123" matches "123" whatever else the file holds.
+@st.cache_data(show_spinner="Reading file...")
+def load_ids(file_bytes, file_name, has_header):
+    header = 0 if has_header else None
+    if file_name.endswith('.xlsx'):
+        column = pd.read_excel(io.BytesIO(file_bytes), usecols=[0], header=header, dtype=str).iloc[:, 0]
+    else:
+        column = pd.read_csv(io.BytesIO(file_bytes), usecols=[0], header=header, dtype=str).iloc[:, 0]
+    column = column.dropna().str.strip()
+    return column[column != ''].to_numpy()
+
+# Function to hash two large ID columns into one table of distinct IDs, with a boolean
+# membership column per set, so every operation afterwards is elementwise logic
+@st.cache_data(show_spinner="Hashing IDs...")
+def membership_columns(file_bytes_a, file_name_a, file_bytes_b, file_name_b, has_header):
+    ids_a = load_ids(file_bytes_a, file_name_a, has_header)
+    ids_b = load_ids(file_bytes_b, file_name_b, has_header)
+    codes, distinct_ids = pd.factorize(np.concatenate([ids_a, ids_b]))
+
+    in_a = np.zeros(len(distinct_ids), dtype=bool)
+    in_b = np.zeros(len(distinct_ids), dtype=bool)
+    in_a[codes[:len(ids_a)]] = True
+    in_b[codes[len(ids_a):]] = True
+    return distinct_ids, in_a, in_b
+
+# Function to apply a set operation to the membership columns
+def large_set_operation(distinct_ids, in_a, in_b, operation):
+    # The universal set is A ∪ B, so each complement equals the matching difference
+    if operation == "Union":
+        members = in_a | in_b
+    elif operation == "Intersection":
+        members = in_a & in_b
+    elif operation in ("Difference (A - B)", "Complement of B"):
+        members = in_a & ~in_b
+    elif operation in ("Difference (B - A)", "Complement of A"):
+        members = in_b & ~in_a
+    return int(in_a.sum()), int(in_b.sum()), distinct_ids[members]
+
+# Function to show the size of a large result, one page of it and a download link
+def show_large_result(operation, size_a, size_b, result):
+    col1, col2, col3 = st.columns(3)
+    col1.metric("|A|", f"{size_a:,}")
+    col2.metric("|B|", f"{size_b:,}")
+    col3.metric(f"|{operation}|", f"{len(result):,}")
+
+    page_size = 100
+    num_pages = max(-(-len(result) // page_size), 1)
+    page_number = st.number_input("Page", min_value=1, max_value=num_pages, value=1)
+    start = (page_number - 1) * page_size
+    st.dataframe({"Element": result[start:start + page_size]}, use_container_width=True)
+    st.caption(f"Page {page_number:,} of {num_pages:,}")
+
+    # Writing millions of IDs out is only worth doing when asked for
+    if st.checkbox("Prepare the full result for download"):
+        st.download_button("Download result (CSV)", pd.Series(result).to_csv(index=False, header=False),
+                           file_name="set_result.csv", mime="text/csv")
+
+def format_set_output(s):
+    formatted_output = ', '.join(repr(el) for el in s)
     return '{' + formatted_output + '}'
 
 st.title("Set Operations App")
 
-# Use columns instead of beta_columns
-col1, col2 = st.columns(2)
-
-with col1:
-    set_a_input = st.text_input("Set A (comma separated)", "Apple, Orange, Banana")
-
-with col2:
-    set_b_input = st.text_input("Set B (comma separated)", "Apple, Grape, Cherry")
-
-operation = st.selectbox("Choose an Operation", 
-                         ["Union", "Intersection", "Difference (A - B)", 
-                          "Difference (B - A)", "Power Set of A", "Power Set of B", 
-                          "Complement of A", "Complement of B"])
-
-if st.button("Compute"):
-    try:
-        setA = {item.strip() for item in set_a_input.split(',') if item.strip()}
-        setB = {item.strip() for item in set_b_input.split(',') if item.strip()}
-        result = None
-
-        if operation == "Union":
-            result = setA | setB
-        elif operation == "Intersection":
-            result = setA & setB
-        elif operation == "Difference (A - B)":
-            result = setA - setB
-        elif operation == "Difference (B - A)":
-            result = setB - setA
-        elif operation == "Power Set of A":
-            result = power_set(setA)
-        elif operation == "Power Set of B":
-            result = power_set(setB)
-        elif operation == "Complement of A":
-            universal_set = setA | setB
-            result = universal_set - setA
-        elif operation == "Complement of B":
-            universal_set = setA | setB
-            result = universal_set - setB
-
-        st.success(f"Result of {operation}: {format_set_output(result)}")
-    except Exception as e:
-        st.error(f"An error occurred: {e}")
+input_mode = st.radio("Input", ["Type the sets", "Upload files"], horizontal=True)
+
+if input_mode == "Upload files":
+    col1, col2 = st.columns(2)
+
+    with col1:
+        file_a = st.file_uploader("Set A (one ID per row)", type=["csv", "txt", "xlsx"], key="file_a")
+
+    with col2:
+        file_b = st.file_uploader("Set B (one ID per row)", type=["csv", "txt", "xlsx"], key="file_b")
+
+    has_header = st.checkbox("Files have a header row", value=True)
+    operation = st.selectbox("Choose an Operation",
+                             ["Union", "Intersection", "Difference (A - B)",
+                              "Difference (B - A)", "Complement of A", "Complement of B"])
+
+    if file_a is not None and file_b is not None:
+        try:
+            columns = membership_columns(file_a.getvalue(), file_a.name, file_b.getvalue(), file_b.name, has_header)
+            show_large_result(operation, *large_set_operation(*columns, operation))
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+    else:
+        st.info("Upload a file for each set. The IDs are read from the first column.")
+else:
+    # Use columns instead of beta_columns
+    col1, col2 = st.columns(2)
+
+    with col1:
+        set_a_input = st.text_input("Set A (comma separated)", "Apple, Orange, Banana")
+
+    with col2:
+        set_b_input = st.text_input("Set B (comma separated)", "Apple, Grape, Cherry")
+
+    operation = st.selectbox("Choose an Operation", 
+                             ["Union", "Intersection", "Difference (A - B)", 
+                              "Difference (B - A)", "Power Set of A", "Power Set of B", 
+                              "Complement of A", "Complement of B"])
+
+    setA = {item.strip() for item in set_a_input.split(',') if item.strip()}
+    setB = {item.strip() for item in set_b_input.split(',') if item.strip()}
+
+    if operation == "Power Set of A":
+        show_power_set("A", setA)
+    elif operation == "Power Set of B":
+        show_power_set("B", setB)
+    elif st.button("Compute"):
+        try:
+            result = None
+
+            if operation == "Union":
+                result = setA | setB
+            elif operation == "Intersection":
+                result = setA & setB
+            elif operation == "Difference (A - B)":
+                result = setA - setB
+            elif operation == "Difference (B - A)":
+                result = setB - setA
+            elif operation == "Complement of A":
+                universal_set = setA | setB
+                result = universal_set - setA
+            elif operation == "Complement of B":
+                universal_set = setA | setB
+                result = universal_set - setB
+
+            st.success(f"Result of {operation}: {format_set_output(result)}")
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
 
 # Add a signature
 components.html(
@@ -1,6 +1,8 @@
+import os
 import numpy as np
 import plotly.graph_objects as go
 import streamlit as st
+from coin_stream import log_checkpoints, stream_flips
 
 # Set page title and icon
 st.set_page_config(page_title="Coin Flip Simulation", page_icon="🎲")
@@ -13,62 +15,194 @@ This app simulates flipping a fair coin multiple times and visualizes how the pr
 
 # Sidebar for user input
 st.sidebar.header("Settings")
-num_flips = st.sidebar.slider("Number of Coin Flips", min_value=10, max_value=10000, value=1000, step=10)
+mode = st.sidebar.radio("Mode", ["Interactive", "Streaming", "Ensemble"], help="Streaming flips up to a billion coins in chunks, keeping only a log-spaced sample of the running proportion. Ensemble flips hundreds of independent sequences and shows the spread of their running proportions.")
+if mode == "Interactive":
+    num_flips = st.sidebar.slider("Number of Coin Flips", min_value=10, max_value=10000, value=1000, step=10)
+elif mode == "Ensemble":
+    num_flips = st.sidebar.slider("Number of Coin Flips", min_value=100, max_value=1_000_000, value=100_000, step=100)
+    num_sequences = st.sidebar.slider("Number of Sequences", min_value=10, max_value=1000, value=500, step=10)
+else:
+    num_flips = st.sidebar.number_input("Number of Coin Flips", min_value=10, max_value=10**10, value=10**8, step=10**6)
+    num_workers = st.sidebar.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1, value=1)
 seed = st.sidebar.number_input("Random Seed", value=42, help="Set a seed for reproducibility.")
 
-# Simulate coin flips
-np.random.seed(seed)
-flips = np.random.randint(0, 2, num_flips)  # 1 = Heads, 0 = Tails
-
-# Cumulative counts of heads and tails
-cumulative_heads = np.cumsum(flips)
-cumulative_tails = np.arange(1, num_flips + 1) - cumulative_heads
-
-# Probabilities over time
-prob_heads = cumulative_heads / np.arange(1, num_flips + 1)
-prob_tails = cumulative_tails / np.arange(1, num_flips + 1)
-
-# Create interactive plot
-fig = go.Figure()
-
-# Add traces for heads and tails
-fig.add_trace(go.Scatter(
-    x=np.arange(1, num_flips + 1),
-    y=prob_heads,
-    mode="lines",
-    name="Probability of Heads",
-    line=dict(color="blue")
-))
-
-fig.add_trace(go.Scatter(
-    x=np.arange(1, num_flips + 1),
-    y=prob_tails,
-    mode="lines",
-    name="Probability of Tails",
-    line=dict(color="orange")
-))
-
-# Add theoretical probability line
-fig.add_trace(go.Scatter(
-    x=np.arange(1, num_flips + 1),
-    y=[0.5] * num_flips,
-    mode="lines",
-    name="Theoretical Probability (0.5)",
-    line=dict(color="red", dash="dash")
-))
-
-# Customize layout
-fig.update_layout(
-    title="Probability of Heads or Tails Over Time",
-    xaxis_title="Number of Flips",
-    yaxis_title="Probability",
-    hovermode="x unified",
-    showlegend=True,
-    template="plotly_white"
-)
-
-# Display the plot
-st.plotly_chart(fig, use_container_width=True)
+# Function to extend the flips kept in session state, flipping only the coins not yet flipped
+def run_simulation(num_flips, seed):
+    state = st.session_state.get("coin_flips")
+    if state is None or state["seed"] != seed:
+        state = {
+            "seed": seed,
+            "rng": np.random.default_rng(seed),
+            "cumulative_heads": np.zeros(0, dtype=np.int64),
+        }
+        st.session_state["coin_flips"] = state
+
+    num_new = num_flips - len(state["cumulative_heads"])
+    if num_new > 0:
+        # One uniform per flip, so the sequence for a seed is the same however it was extended
+        flips = state["rng"].random(num_new) < 0.5  # True = Heads, False = Tails
+        offset = state["cumulative_heads"][-1] if len(state["cumulative_heads"]) else 0
+        state["cumulative_heads"] = np.concatenate([state["cumulative_heads"], offset + np.cumsum(flips)])
+
+    return state["cumulative_heads"][:num_flips]
+
+# Function to cache streaming runs, which only hold the log-spaced sample and the final counts
+@st.cache_data(show_spinner="Flipping coins...")
+def run_streaming_simulation(num_flips, seed, num_workers):
+    return stream_flips(num_flips, seed, num_workers)
+
+# Function to simulate many independent sequences at once and take pointwise percentiles of their running proportions
+@st.cache_data(show_spinner="Flipping coins...")
+def run_ensemble_simulation(num_flips, num_sequences, seed, num_points=1000):
+    rng = np.random.default_rng(seed)
+    flip_counts = log_checkpoints(num_flips, num_points)
+
+    # The heads between two checkpoints are Binomial(gap, 0.5), so each row of the
+    # 2-D array is a full sequence of num_flips flips observed at the checkpoints
+    gaps = np.diff(flip_counts, prepend=0)
+    cumulative_heads = np.cumsum(rng.binomial(gaps, 0.5, size=(num_sequences, len(gaps))), axis=1)
+    proportions = cumulative_heads / flip_counts
+
+    lower, median, upper = np.percentile(proportions, [5, 50, 95], axis=0)
+    return flip_counts, lower, median, upper
+
+# 95th percentile of the standard normal, for the theoretical 90% band
+z_90 = 1.645
+
+if mode == "Ensemble":
+    flip_counts, lower, median, upper = run_ensemble_simulation(num_flips, num_sequences, int(seed))
+    half_width = z_90 * 0.5 / np.sqrt(flip_counts)
+
+    fig = go.Figure()
+
+    # Empirical 5-95% envelope and median of the running proportion of heads
+    fig.add_trace(go.Scatter(
+        x=flip_counts,
+        y=upper,
+        mode="lines",
+        name="95th Percentile",
+        line=dict(color="blue", width=1)
+    ))
+    fig.add_trace(go.Scatter(
+        x=flip_counts,
+        y=lower,
+        mode="lines",
+        name="5th Percentile",
+        fill="tonexty",
+        fillcolor="rgba(0, 0, 255, 0.15)",
+        line=dict(color="blue", width=1)
+    ))
+    fig.add_trace(go.Scatter(
+        x=flip_counts,
+        y=median,
+        mode="lines",
+        name="Median",
+        line=dict(color="blue")
+    ))
+
+    # Theoretical band 0.5 ± 1.645 · 0.5/√n
+    fig.add_trace(go.Scatter(
+        x=flip_counts,
+        y=0.5 + half_width,
+        mode="lines",
+        name="Theoretical 90% Band (±1.645·0.5/√n)",
+        line=dict(color="red", dash="dot")
+    ))
+    fig.add_trace(go.Scatter(
+        x=flip_counts,
+        y=0.5 - half_width,
+        mode="lines",
+        showlegend=False,
+        line=dict(color="red", dash="dot")
+    ))
+    fig.add_trace(go.Scatter(
+        x=[1, num_flips],
+        y=[0.5, 0.5],
+        mode="lines",
+        name="Theoretical Probability (0.5)",
+        line=dict(color="red", dash="dash")
+    ))
+
+    fig.update_layout(
+        title=f"Running Proportion of Heads Across {num_sequences} Sequences",
+        xaxis_title="Number of Flips",
+        yaxis_title="Proportion of Heads",
+        hovermode="x unified",
+        showlegend=True,
+        template="plotly_white"
+    )
+    fig.update_xaxes(type="log")
+    fig.update_yaxes(range=[0, 1])
+
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Spread of the final proportions against theory
+    col1, col2 = st.columns(2)
+    col1.metric("Empirical 90% Width", f"{upper[-1] - lower[-1]:.5f}")
+    col2.metric("Theoretical 90% Width", f"{2 * half_width[-1]:.5f}")
+else:
+    if mode == "Interactive":
+        # Cumulative counts of heads and tails
+        flip_counts = np.arange(1, num_flips + 1)
+        cumulative_heads = run_simulation(num_flips, seed)
+        total_heads = cumulative_heads[-1]
+    else:
+        flip_counts, cumulative_heads, total_heads = run_streaming_simulation(int(num_flips), int(seed), int(num_workers))
+    cumulative_tails = flip_counts - cumulative_heads
+
+    # Probabilities over time
+    prob_heads = cumulative_heads / flip_counts
+    prob_tails = cumulative_tails / flip_counts
+
+    # Create interactive plot
+    fig = go.Figure()
+
+    # Add traces for heads and tails
+    fig.add_trace(go.Scatter(
+        x=flip_counts,
+        y=prob_heads,
+        mode="lines",
+        name="Probability of Heads",
+        line=dict(color="blue")
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=flip_counts,
+        y=prob_tails,
+        mode="lines",
+        name="Probability of Tails",
+        line=dict(color="orange")
+    ))
+
+    # Add theoretical probability line
+    fig.add_trace(go.Scatter(
+        x=[1, num_flips],
+        y=[0.5, 0.5],
+        mode="lines",
+        name="Theoretical Probability (0.5)",
+        line=dict(color="red", dash="dash")
+    ))
+
+    # Customize layout
+    fig.update_layout(
+        title="Probability of Heads or Tails Over Time",
+        xaxis_title="Number of Flips",
+        yaxis_title="Probability",
+        hovermode="x unified",
+        showlegend=True,
+        template="plotly_white"
+    )
+    if mode == "Streaming":
+        fig.update_xaxes(type="log")
+
+    # Display the plot
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Exact final counts
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Heads", f"{total_heads:,}")
+    col2.metric("Tails", f"{num_flips - total_heads:,}")
+    col3.metric("Proportion of Heads", f"{total_heads / num_flips:.6f}")
 
 # Add signature
 st.markdown("---")
@@ -0,0 +1,60 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Flips generated at once; peak memory is about one byte per flip in a chunk
+CHUNK_SIZE = 2 ** 22
+
+# Flips per independent RNG stream; the unit of work handed to a process
+BLOCK_SIZE = 2 ** 26
+
+# Log-spaced flip counts at which the running proportion is recorded
+def log_checkpoints(num_flips, num_points=1000):
+    return np.unique(np.rint(np.geomspace(1, num_flips, num_points)).astype(np.int64))
+
+# Function to flip the coins in [start, stop) chunk by chunk, counting heads at the checkpoints in that range
+def count_heads(seed_seq, start, stop, checkpoints, chunk_size=CHUNK_SIZE):
+    rng = np.random.default_rng(seed_seq)
+    heads = 0
+    heads_at_checkpoints = []
+
+    for chunk_start in range(start, stop, chunk_size):
+        n = min(chunk_size, stop - chunk_start)
+        # Eight flips per random byte, 1 = Heads, 0 = Tails
+        flips = np.unpackbits(np.frombuffer(rng.bytes((n + 7) // 8), dtype=np.uint8), count=n)
+
+        # Checkpoints in this chunk, as numbers of flips into the chunk
+        cuts = checkpoints[(checkpoints > chunk_start) & (checkpoints <= chunk_start + n)] - chunk_start
+        if len(cuts):
+            partial = np.add.reduceat(flips[:cuts[-1]], np.r_[0, cuts[:-1]], dtype=np.int64)
+            heads_at_checkpoints.append(heads + np.cumsum(partial))
+
+        heads += int(np.count_nonzero(flips))
+
+    if heads_at_checkpoints:
+        return heads, np.concatenate(heads_at_checkpoints)
+    return heads, np.zeros(0, dtype=np.int64)
+
+# Function to stream num_flips coin flips in constant memory, optionally over several processes.
+# Every block of BLOCK_SIZE flips has its own RNG stream spawned from the seed, so the result
+# only depends on the seed and not on the number of processes.
+def stream_flips(num_flips, seed, num_workers=1, num_points=1000):
+    checkpoints = log_checkpoints(num_flips, num_points)
+    starts = list(range(0, num_flips, BLOCK_SIZE))
+    stops = [min(start + BLOCK_SIZE, num_flips) for start in starts]
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    blocks = (seeds, starts, stops, [checkpoints] * len(starts))
+
+    if num_workers > 1 and len(starts) > 1:
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(starts))) as pool:
+            results = list(pool.map(count_heads, *blocks))
+    else:
+        results = list(map(count_heads, *blocks))
+
+    # Offset each block's running counts by the heads in the blocks before it
+    total_heads = 0
+    cumulative_heads = []
+    for block_heads, heads_at_checkpoints in results:
+        cumulative_heads.append(total_heads + heads_at_checkpoints)
+        total_heads += block_heads
+
+    return checkpoints, np.concatenate(cumulative_heads), total_heads
@@ -1,3 +1,6 @@
+import io
+import os
+import sys
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -8,6 +11,9 @@ import statsmodels.formula.api as smf
 from scipy import stats
 from statsmodels.graphics.regressionplots import influence_plot
 from sklearn.impute import SimpleImputer
+# The shared helpers live in apps/, one level above this app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from column_profiler import file_digest, profile_file
 
 def load_data(uploaded_file):
     if uploaded_file is not None:
@@ -46,14 +52,14 @@ def plot_diagnostic_plots(fitted_model, X, residuals):
     plt.title('Residuals vs Leverage', color='green')
     st.pyplot(plt)
 
-def summary_statistics(data):
-    summary = pd.DataFrame({'Dtype': data.dtypes})
-    summary['Missing %'] = 100 * (1 - data.count() / len(data))
-    summary['Unique'] = data.nunique()
-    summary['Most Common'] = data.apply(lambda x: x.mode()[0] if x.dtype == 'object' else np.nan)
-    summary['Mean'] = data.mean(numeric_only=True)
-    summary['Std'] = data.std(numeric_only=True)
-    return summary
+# Function to profile every column of an uploaded file in one chunked pass, once per file contents
+@st.cache_data(show_spinner='Profiling columns...')
+def load_profile(digest, _file_bytes, file_name):
+    return profile_file(io.BytesIO(_file_bytes), file_name)
+
+# Function to summarize the kept columns from the profile of the whole file
+def summary_statistics(profile, columns):
+    return profile.loc[columns, ['Dtype', 'Missing %', 'Unique', 'Most Common', 'Mean', 'Std']]
 
 def correlation_heatmap(data):
     plt.figure(figsize=(10, 8))
@@ -120,7 +126,8 @@ if uploaded_file is not None:
         st.write(data)
         st.markdown("<h2 style='color:blue;'>Summary Statistics:</h2>", unsafe_allow_html=True)
         #st.subheader("Summary Statistics")
-        st.write(summary_statistics(data))
+        file_bytes = uploaded_file.getvalue()
+        st.write(summary_statistics(load_profile(file_digest(file_bytes), file_bytes, uploaded_file.name), data.columns))
 
         if data.isnull().values.any():
             imputation_method = st.selectbox("Select imputation method for missing values", 